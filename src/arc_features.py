@@ -0,0 +1,186 @@
+# src/arc_features.py
+"""
+Emotion-arc features for a batch of songs, computed with array operations.
+
+A batch is the same layout the results store uses: a (segments, emotions)
+array of all songs' segments concatenated, plus song offsets
+(offsets[k]:offsets[k + 1] is song k's segment range). Every feature is
+computed for the whole batch at once; ArcFeatures bundles them so a song's
+features are computed once and shared by the prompt builder, the timeline
+plot and corpus analytics.
+"""
+
+import numpy as np
+
+from .config import EMOTIONS, ARC_SMOOTH_WINDOW
+
+THIRDS = ("beginning", "middle", "end")
+
+def song_index(offsets) -> np.ndarray:
+    """
+    Song number of every segment.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+def label_counts(labels, offsets) -> np.ndarray:
+    """
+    (songs, emotions) number of segments with each label.
+    """
+    n_songs, n_emotions = len(offsets) - 1, len(EMOTIONS)
+    keys = song_index(offsets) * n_emotions + np.asarray(labels, dtype=np.int64)
+    return np.bincount(keys, minlength=n_songs * n_emotions).reshape(n_songs, n_emotions)
+
+def _pairs(labels, offsets):
+    # (song, position of the second segment, previous label, label) for every
+    # pair of consecutive segments of the same song
+    labels = np.asarray(labels, dtype=np.int64)
+    songs = song_index(offsets)
+    same = songs[1:] == songs[:-1]
+    pos = np.arange(1, len(labels)) - np.asarray(offsets, dtype=np.int64)[songs[1:]]
+    return songs[1:][same], pos[same], labels[:-1][same], labels[1:][same]
+
+def transition_matrices(labels, offsets) -> np.ndarray:
+    """
+    (songs, emotions, emotions) counts of consecutive label pairs (row = from).
+    """
+    n_songs, n_emotions = len(offsets) - 1, len(EMOTIONS)
+    songs, _, prev, nxt = _pairs(labels, offsets)
+    keys = (songs * n_emotions + prev) * n_emotions + nxt
+    return np.bincount(keys, minlength=n_songs * n_emotions ** 2).reshape(n_songs, n_emotions, n_emotions)
+
+def transitions(labels, offsets):
+    """
+    Label changes as parallel arrays (song, position, from, to), ordered by
+    song then position; position is the 0-based index of the first segment
+    with the new label.
+    """
+    songs, pos, prev, nxt = _pairs(labels, offsets)
+    changed = prev != nxt
+    return songs[changed], pos[changed], prev[changed], nxt[changed]
+
+def smooth_arcs(probs, offsets, window: int = ARC_SMOOTH_WINDOW) -> np.ndarray:
+    """
+    Centered moving average of each song's probability curve over `window`
+    segments; the window is cut at song boundaries, never mixing songs.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(probs) == 0 or window <= 1:
+        return probs.astype(np.float32)
+    songs = song_index(offsets)
+    idx = np.arange(len(probs))
+    half = window // 2
+    lo = np.maximum(idx - half, offsets[songs])
+    hi = np.minimum(idx + window - half, offsets[songs + 1])
+    csum = np.concatenate([np.zeros((1, probs.shape[1])), np.cumsum(probs, axis=0)])
+    return ((csum[hi] - csum[lo]) / (hi - lo)[:, None]).astype(np.float32)
+
+def change_points(smoothed, offsets):
+    """
+    (song, position) arrays where the dominant emotion of the smoothed arc
+    changes, i.e. sustained shifts rather than single-segment flips.
+    """
+    songs, pos, _, _ = transitions(np.asarray(smoothed).argmax(axis=1), offsets)
+    return songs, pos
+
+def dominant_thirds(values, offsets) -> np.ndarray:
+    """
+    (songs, 3) dominant emotion of the beginning, middle and end third of
+    each song; -1 where a third has no segments (songs shorter than three
+    segments). values: (segments, emotions) probs, dominant = largest summed
+    probability, or (segments,) labels, dominant = most frequent label.
+    """
+    values = np.asarray(values)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_songs, n_emotions = len(offsets) - 1, len(EMOTIONS)
+    out = np.full((n_songs, 3), -1, dtype=np.int8)
+    if len(values) == 0:
+        return out
+    songs = song_index(offsets)
+    lengths = np.diff(offsets)
+    keys = songs * 3 + 3 * (np.arange(len(values)) - offsets[songs]) // lengths[songs]
+    if values.ndim == 1:
+        sums = np.bincount(keys * n_emotions + values.astype(np.int64), minlength=n_songs * 3 * n_emotions)
+        sums = sums.reshape(n_songs * 3, n_emotions)
+        present = np.bincount(keys, minlength=n_songs * 3) > 0
+        out.reshape(-1)[present] = sums[present].argmax(axis=1)
+        return out
+    # segments of one (song, third) are contiguous, so each group is a run
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    sums = np.add.reduceat(values.astype(np.float64), starts, axis=0)
+    out.reshape(-1)[keys[starts]] = sums.argmax(axis=1)
+    return out
+
+class ArcFeatures:
+    """
+    All arc features of a batch of songs:
+      labels              (segments,) argmax emotion per segment
+      smoothed            (segments, emotions) smoothed arcs
+      label_counts        (songs, emotions)
+      transition_matrix   (songs, emotions, emotions)
+      thirds              (songs, 3) dominant emotion per beginning/middle/end, -1 if empty
+    plus per-song accessors for the transition list and change points.
+    """
+
+    def __init__(self, probs, offsets, window: int = ARC_SMOOTH_WINDOW):
+        probs = np.asarray(probs, dtype=np.float32).reshape(-1, len(EMOTIONS))
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.labels = probs.argmax(axis=1) if len(probs) else np.zeros(0, dtype=np.int64)
+        self.smoothed = smooth_arcs(probs, self.offsets, window)
+        self.label_counts = label_counts(self.labels, self.offsets)
+        self.transition_matrix = transition_matrices(self.labels, self.offsets)
+        self.thirds = dominant_thirds(probs, self.offsets)
+        self._transitions = transitions(self.labels, self.offsets)
+        self._change_points = change_points(self.smoothed, self.offsets)
+
+    @classmethod
+    def from_songs(cls, probs_per_song, window: int = ARC_SMOOTH_WINDOW) -> "ArcFeatures":
+        """
+        Batch from a list of per-song (segments, emotions) arrays.
+        """
+        arrays = [np.asarray(p, dtype=np.float32).reshape(-1, len(EMOTIONS)) for p in probs_per_song]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in arrays], out=offsets[1:])
+        probs = np.concatenate(arrays) if arrays else np.zeros((0, len(EMOTIONS)), dtype=np.float32)
+        return cls(probs, offsets, window)
+
+    @classmethod
+    def of_song(cls, song_segments, window: int = ARC_SMOOTH_WINDOW) -> "ArcFeatures":
+        """
+        Batch of one song from its segment results (SongResults or a list of
+        segment dicts).
+        """
+        probs = getattr(song_segments, "probs", None)
+        if probs is None:
+            probs = [seg["probs"] for seg in song_segments]
+        return cls.from_songs([probs], window)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @staticmethod
+    def _song_rows(arrays, k: int):
+        songs = arrays[0]
+        lo, hi = np.searchsorted(songs, [k, k + 1])
+        return [a[lo:hi] for a in arrays[1:]]
+
+    def transitions(self, k: int):
+        """
+        Song k's label changes as [(position, from_emotion, to_emotion)].
+        """
+        pos, prev, nxt = self._song_rows(self._transitions, k)
+        return [(int(p), EMOTIONS[a], EMOTIONS[b]) for p, a, b in zip(pos, prev, nxt)]
+
+    def change_points(self, k: int) -> np.ndarray:
+        """
+        Positions in song k where the smoothed dominant emotion changes.
+        """
+        (pos,) = self._song_rows(self._change_points, k)
+        return pos
+
+    def dominant_by_third(self, k: int) -> dict:
+        """
+        {"beginning"|"middle"|"end": emotion} for song k (empty thirds left out).
+        """
+        return {name: EMOTIONS[e] for name, e in zip(THIRDS, self.thirds[k]) if e >= 0}
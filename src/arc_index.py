@@ -0,0 +1,249 @@
+# src/arc_index.py
+"""
+Emotion-arc similarity index: "find songs with a similar emotional trajectory".
+
+Each song's (segments x emotions) probability curve is resampled to
+ARC_POINTS points, flattened and L2-normalized, and stored as float16 rows
+in append-only parts:
+
+  <root>/part-00000/vectors.npy     float16 (songs, ARC_POINTS * len(EMOTIONS))
+  <root>/part-00000/song_ids.json
+
+Queries rank every song by cosine similarity (one chunked matrix-vector
+product) and can rerank the best candidates by a banded DTW distance.
+
+    python -m src.arc_index build                 # from the results store
+    python -m src.arc_index query "Artist - Song" -k 10 --dtw
+    python -m src.arc_index stats
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from .config import EMOTIONS, RESULTS_DIR, ARC_INDEX_DIR, ARC_POINTS, ARC_PART_SONGS
+from .results_store import PartWriter, ResultsStore, part_names
+
+# rows scored per block in queries (bounds the float32 scratch memory)
+_QUERY_BLOCK = 1 << 16
+
+def resample_arc(probs, points: int = ARC_POINTS) -> np.ndarray:
+    """
+    Linearly resample a (segments, emotions) curve to (points, emotions),
+    so songs of any length are compared over the same relative positions.
+    """
+    probs = np.asarray(probs, dtype=np.float32)
+    n = len(probs)
+    if n == 0:
+        return np.zeros((points, len(EMOTIONS)), dtype=np.float32)
+    if n == 1:
+        return np.repeat(probs, points, axis=0)
+    pos = np.linspace(0.0, n - 1, points, dtype=np.float32)
+    left = np.floor(pos).astype(np.int64)
+    right = np.minimum(left + 1, n - 1)
+    frac = (pos - left)[:, None]
+    return probs[left] * (1.0 - frac) + probs[right] * frac
+
+def arc_vector(probs, points: int = ARC_POINTS) -> np.ndarray:
+    """
+    Flattened, L2-normalized resampled arc (the row stored in the index).
+    """
+    vec = resample_arc(probs, points).ravel()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+def dtw_distances(query: np.ndarray, candidates: np.ndarray, band: int) -> np.ndarray:
+    """
+    DTW distance between one (points, emotions) arc and each of
+    (n, points, emotions) candidates, restricted to |i - j| <= band
+    and vectorized over candidates.
+    """
+    n, points, _ = candidates.shape
+    # cost[c, i, j] = euclidean distance between query[i] and candidate c at j
+    cost = np.linalg.norm(query[None, :, None, :] - candidates[:, None, :, :], axis=-1)
+    acc = np.full((n, points + 1, points + 1), np.inf, dtype=np.float32)
+    acc[:, 0, 0] = 0.0
+    for i in range(1, points + 1):
+        for j in range(max(1, i - band), min(points, i + band) + 1):
+            best = np.minimum(np.minimum(acc[:, i - 1, j], acc[:, i, j - 1]), acc[:, i - 1, j - 1])
+            acc[:, i, j] = cost[:, i - 1, j - 1] + best
+    return acc[:, points, points] / points
+
+class ArcWriter(PartWriter):
+    """
+    Appends song arcs to an index directory as numbered parts; a part is
+    written once it holds `part_songs` songs (and on close()).
+    """
+
+    def __init__(self, root: str = ARC_INDEX_DIR, points: int = ARC_POINTS, part_songs: int = ARC_PART_SONGS):
+        self.points = points
+        self.part_songs = part_songs
+        super().__init__(root)
+
+    def _reset(self):
+        self.song_ids = []
+        self.vectors = []
+
+    def __len__(self):
+        return len(self.song_ids)
+
+    def add(self, song_id: str, probs):
+        self.add_vector(song_id, arc_vector(probs, self.points))
+
+    def add_vector(self, song_id: str, vector):
+        """
+        Add an already-computed arc vector (e.g. copied from another index).
+        """
+        self.song_ids.append(song_id)
+        self.vectors.append(vector)
+        if len(self.vectors) >= self.part_songs:
+            self.flush()
+
+    def _write(self, part_dir: str):
+        np.save(os.path.join(part_dir, "vectors.npy"), np.stack(self.vectors).astype(np.float16))
+        with open(os.path.join(part_dir, "song_ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self.song_ids, f, ensure_ascii=False)
+
+class ArcIndex:
+    """
+    Read side of an arc index: every part under `root` stacked into one
+    (songs, dim) float16 matrix. When a song was added more than once
+    (reruns), the newest part wins.
+    """
+
+    def __init__(self, root: str = ARC_INDEX_DIR, points: int = ARC_POINTS):
+        self.root = root
+        self.points = points
+        self.dim = points * len(EMOTIONS)
+        self.song_ids = []
+        blocks = []
+        for name in part_names(root):
+            part_dir = os.path.join(root, name)
+            vectors = np.load(os.path.join(part_dir, "vectors.npy"), mmap_mode="r")
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"{part_dir} holds {vectors.shape[1]}-dim arcs, expected {self.dim} "
+                    f"(ARC_POINTS changed? rebuild the index)"
+                )
+            with open(os.path.join(part_dir, "song_ids.json"), encoding="utf-8") as f:
+                self.song_ids.extend(json.load(f))
+            blocks.append(vectors)
+        self.vectors = np.concatenate(blocks) if blocks else np.zeros((0, self.dim), dtype=np.float16)
+
+        self.index = {}  # song_id -> row
+        self.live = np.ones(len(self.song_ids), dtype=bool)
+        for row, song_id in enumerate(self.song_ids):
+            old = self.index.get(song_id)
+            if old is not None:
+                self.live[old] = False
+            self.index[song_id] = row
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, song_id):
+        return song_id in self.index
+
+    def vector(self, song_id: str) -> np.ndarray:
+        return np.asarray(self.vectors[self.index[song_id]], dtype=np.float32)
+
+    def cosine_scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of a normalized query vector to every row
+        (superseded rows score -inf).
+        """
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), _QUERY_BLOCK):
+            block = np.asarray(self.vectors[start:start + _QUERY_BLOCK], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        # float16 rows can push identical arcs slightly past 1
+        np.clip(scores, -1.0, 1.0, out=scores)
+        scores[~self.live] = -np.inf
+        return scores
+
+    def query(self, query, k: int = 10, exclude=None, dtw: bool = False, rerank: int = 10, band: int = None):
+        """
+        Top-k most similar songs to `query` (a song id in the index, or a
+        (segments, emotions) probability array) as [(song_id, score)].
+        With dtw=True the best k * rerank cosine candidates are reranked by
+        banded DTW distance (score = -distance, so higher is still closer).
+        """
+        if isinstance(query, str):
+            exclude = query if exclude is None else exclude
+            qvec = self.vector(query)
+        else:
+            qvec = arc_vector(query, self.points)
+        scores = self.cosine_scores(qvec)
+        if exclude is not None and exclude in self.index:
+            scores[self.index[exclude]] = -np.inf
+
+        n_live = int(np.isfinite(scores).sum())
+        n_cand = min(k * rerank if dtw else k, n_live)
+        if n_cand <= 0:
+            return []
+        top = np.argpartition(-scores, n_cand - 1)[:n_cand]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if not dtw:
+            return [(self.song_ids[r], float(scores[r])) for r in top[:k]]
+
+        shape = (self.points, len(EMOTIONS))
+        rows = np.sort(top)
+        cands = np.asarray(self.vectors[rows], dtype=np.float32)
+        dist = dtw_distances(
+            qvec.reshape(shape), cands.reshape(len(cands), *shape),
+            band=max(1, self.points // 8) if band is None else band,
+        )
+        best = np.argsort(dist, kind="stable")[:k]
+        return [(self.song_ids[rows[b]], -float(dist[b])) for b in best]
+
+def build_from_results(results_dir: str = RESULTS_DIR, root: str = ARC_INDEX_DIR, points: int = ARC_POINTS) -> ArcIndex:
+    """
+    (Re)build the index from every song in a results store.
+    """
+    shutil.rmtree(root, ignore_errors=True)
+    writer = ArcWriter(root, points=points)
+    for song_id, _, results in ResultsStore(results_dir):
+        writer.add(song_id, results.probs)
+    writer.close()
+    return ArcIndex(root, points=points)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ARC_INDEX_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="rebuild the index from a results store")
+    p_build.add_argument("--results", default=RESULTS_DIR)
+    p_query = sub.add_parser("query", help="songs with the most similar arc to a song")
+    p_query.add_argument("song_id", help='"Artist - Song", as in the results store')
+    p_query.add_argument("-k", type=int, default=10)
+    p_query.add_argument("--dtw", action="store_true", help="rerank cosine candidates by banded DTW")
+    sub.add_parser("stats", help="index size")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        t0 = time.perf_counter()
+        index = build_from_results(args.results, args.root)
+        print(f"Indexed {len(index)} songs in {time.perf_counter() - t0:.1f}s -> {args.root}")
+    elif args.command == "query":
+        index = ArcIndex(args.root)
+        if args.song_id not in index:
+            parser.error(f"{args.song_id!r} is not in the index")
+        t0 = time.perf_counter()
+        hits = index.query(args.song_id, k=args.k, dtw=args.dtw)
+        elapsed = time.perf_counter() - t0
+        for rank, (song_id, score) in enumerate(hits, 1):
+            print(f"{rank:>3}. {score:+.4f}  {song_id}")
+        print(f"({len(index)} songs searched in {elapsed * 1000:.0f} ms)")
+    elif args.command == "stats":
+        index = ArcIndex(args.root)
+        print(f"songs:  {len(index)} ({len(index.song_ids)} rows incl. superseded)")
+        print(f"dims:   {index.dim} ({index.points} points x {len(EMOTIONS)} emotions)")
+        print(f"size:   {index.vectors.nbytes / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
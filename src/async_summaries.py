@@ -0,0 +1,179 @@
+# src/async_summaries.py
+
+import asyncio
+import random
+import threading
+import time
+import traceback
+from collections import deque
+
+from .config import LLM_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_MAX_RETRIES
+from .narrative_llm import build_prompts, chat_request
+from .summary_cache import request_key
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    True for failures worth retrying: rate limits (429), request timeouts
+    (408), server errors (5xx), timeouts and connection errors. Anything else
+    (bad key, bad request, a bug in prompt building) fails the same way again.
+    """
+    status = getattr(exc, "status_code", None)  # openai.APIStatusError
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    # APITimeoutError is a subclass of APIConnectionError
+    return isinstance(exc, openai.APIConnectionError)
+
+def _default_client():
+    # same credentials as the blocking client in narrative_llm
+    from openai import AsyncOpenAI
+    from .narrative_llm import api_key
+    return AsyncOpenAI(api_key=api_key())
+
+class AsyncSummarizer:
+    """
+    Generates narrative summaries concurrently on an asyncio loop running in a
+    background thread, so the pipeline never waits on LLM latency.
+
+    `client` is anything with an awaitable `chat.completions.create(**kwargs)`
+    (AsyncOpenAI by default; tests can inject a fake, or point the OpenAI client
+    at a local stub server via OPENAI_BASE_URL).
+
+    submit() queues one song and returns immediately; each summary is written to
+    its path as soon as it arrives. completed() yields (context, result) in
+    submission order, result = {"song_id", "path", "error", "seconds"}.
+
+    Transient API errors (see is_transient) are retried with exponential
+    backoff up to `max_retries` times; any other error fails the song at once.
+
+    With a SummaryCache, requests already answered are served from it, and
+    identical requests in flight at the same time share a single API call.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        concurrency: int = LLM_CONCURRENCY,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        cache=None,
+    ):
+        self.client = client
+        self.cache = cache
+        self.in_flight = {}  # request key -> asyncio future (loop thread only)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.pending = deque()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        async def make_limits():
+            return (
+                asyncio.Semaphore(max(1, concurrency)),
+                TokenBucket(requests_per_minute / 60.0, capacity=concurrency),
+            )
+        self.semaphore, self.bucket = asyncio.run_coroutine_threadsafe(make_limits(), self.loop).result()
+
+    async def _complete(self, request: dict) -> str:
+        if self.client is None:
+            self.client = _default_client()
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    resp = await self.client.chat.completions.create(**request)
+                return resp.choices[0].message.content.strip()
+            except Exception as exc:
+                attempt += 1
+                if attempt > self.max_retries or not is_transient(exc):
+                    raise
+                # exponential backoff with jitter
+                delay = self.backoff_base * (2 ** (attempt - 1))
+                await asyncio.sleep(delay * (0.5 + random.random()))
+
+    async def _cached_complete(self, song_id, request: dict) -> str:
+        if self.cache is not None:
+            cached = self.cache.get(request)
+            if cached is not None:
+                return cached
+        key = request_key(request)
+        shared = self.in_flight.get(key)
+        if shared is not None:
+            return await asyncio.shield(shared)
+
+        shared = asyncio.ensure_future(self._complete(request))
+        self.in_flight[key] = shared
+        try:
+            summary = await shared
+        finally:
+            del self.in_flight[key]
+        if self.cache is not None:
+            self.cache.put(request, summary, song_id=song_id)
+        return summary
+
+    async def _summarize(self, song_id, request, out_path):
+        start = time.perf_counter()
+        try:
+            summary = await self._cached_complete(song_id, request)
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(summary)
+            path, error = out_path, None
+        except Exception:
+            path, error = None, traceback.format_exc()
+        return {"song_id": song_id, "path": path, "error": error, "seconds": time.perf_counter() - start}
+
+    def submit(self, song_id, song_segments, song_importance, out_path, context=None, arc=None):
+        # prompts are built here so the loop thread only holds plain strings
+        request = chat_request(*build_prompts(song_id, song_segments, song_importance, arc))
+        future = asyncio.run_coroutine_threadsafe(
+            self._summarize(song_id, request, out_path), self.loop
+        )
+        self.pending.append((context, future))
+
+    def completed(self, wait: bool = False):
+        """
+        Yield (context, result) for finished summaries, oldest first.
+        With wait=True, block until every submitted summary is done.
+        """
+        while self.pending and (wait or self.pending[0][1].done()):
+            context, future = self.pending.popleft()
+            yield context, future.result()
+
+    def close(self):
+        for _ in self.completed(wait=True):
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
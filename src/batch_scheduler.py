@@ -0,0 +1,207 @@
+# src/batch_scheduler.py
+
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+from .config import EMOTIONS, BATCH_SIZE, SCHEDULER_WINDOW_BATCHES, TOKEN_WINDOW_OVERLAP
+from .run_inference import tokenize_segments, length_sorted_batches, forward_batch
+from .results_store import SongResults
+from .segment_dedup import SegmentInterner
+from .token_windows import plan_windows, window_inputs, special_tokens
+
+class _PendingSong:
+    """
+    Per-line accumulators for one song: each model input covering a line adds
+    its prediction with a weight (1 per line, or tokens covered for packed
+    inputs), and the song is done when no inputs are outstanding.
+    """
+
+    __slots__ = ("song", "logits", "probs", "weights", "remaining")
+
+    def __init__(self, song):
+        n = len(song["segments"])
+        self.song = song
+        self.logits = np.zeros((n, len(EMOTIONS)), dtype=np.float32)
+        self.probs = np.zeros((n, len(EMOTIONS)), dtype=np.float32)
+        self.weights = np.zeros(n, dtype=np.float32)
+        self.remaining = 0
+
+    def add(self, parts, logits, probs):
+        for pos, weight in parts:
+            self.logits[pos] += weight * logits
+            self.probs[pos] += weight * probs
+            self.weights[pos] += weight
+
+    def results(self) -> SongResults:
+        w = self.weights[:, None]
+        return SongResults.from_arrays(self.song["segments"], self.logits / w, self.probs / w)
+
+def iter_song_predictions(
+    songs,
+    tokenizer,
+    model,
+    device,
+    batch_size: int = BATCH_SIZE,
+    window_batches: int = SCHEDULER_WINDOW_BATCHES,
+    cache=None,
+    metrics=None,
+    interner=None,
+    token_budget: int = None,
+    token_overlap: int = TOKEN_WINDOW_OVERLAP,
+    token_cache=None,
+):
+    """
+    Run segment inference across song boundaries.
+
+    Model inputs from consecutive songs are pooled in arrival order; whenever
+    the pool holds a full window (batch_size * window_batches inputs) that
+    window is sorted by token length and run as full batches. Leftover inputs
+    wait for the next songs, so only the very last batch of the run can be partial.
+
+    By default every segment is one input. With token_budget set (total tokens
+    per input, special tokens included) each song's lines are packed into
+    token-budget inputs and over-long lines are split with token_overlap (see
+    token_windows.plan_windows); each line then gets the token-weighted mean
+    of the inputs covering it, so results stay per line without truncation.
+
+    Repeated inputs (segment text after normalize_segment, or the token ids of
+    a packed input) are deduplicated through a SegmentInterner, within and
+    across songs: only the first occurrence is looked up / scored, and its
+    result is copied to every other occurrence, including ones that arrive
+    while it is still in the pool. Pass an interner to read its dedup stats.
+
+    If a PredictionCache is given, cached inputs never enter the pool and
+    freshly computed ones are written back after each window.
+
+    A TokenCache supplies token ids for segments it has seen before (with
+    token_budget set it must hold untruncated line ids without special tokens).
+
+    If a RunMetrics is given, tokenization, forward passes and cache access
+    are timed as stages and tokens/batches are counted.
+
+    Yields (song, seg_results) in input order, where seg_results is the
+    SongResults predict_segments_columnar(song["segments"], ...) would return
+    (per line, also in token-budget mode).
+    """
+    window = batch_size * max(1, window_batches)
+    stage = metrics.stage if metrics is not None else (lambda name: nullcontext())
+    if interner is None:
+        interner = SegmentInterner(unit="token windows" if token_budget else "segments")
+    if token_budget:
+        prefix, suffix = special_tokens(tokenizer)
+        budget = token_budget - len(prefix) - len(suffix)
+    else:
+        budget = None
+    pending = deque()  # songs waiting for some of their inputs
+    pool = deque()     # (input id, cache text, token ids) of distinct inputs, FIFO
+    waiters = {}       # input id -> [(pending song, [(position, weight)])] not yet filled
+
+    def scatter(sid, logits, probs):
+        for p, parts in waiters.pop(sid):
+            p.add(parts, logits, probs)
+            p.remaining -= 1
+
+    def run(n_items):
+        items = [pool.popleft() for _ in range(n_items)]
+        # kept here for the cache write: the interner may already have
+        # evicted them if the window is larger than its capacity
+        results = [None] * n_items
+        for batch in length_sorted_batches([len(ids) for _, _, ids in items], batch_size):
+            with stage("forward"):
+                logits, probs = forward_batch(
+                    [items[i][2] for i in batch], tokenizer, model, device
+                )
+            if metrics is not None:
+                metrics.count("batches")
+            for row, i in enumerate(batch):
+                sid = items[i][0]
+                results[i] = interner.resolve(sid, logits[row], probs[row])
+                scatter(sid, *results[i])
+        if cache is not None:
+            with stage("cache"):
+                cache.put_many(
+                    [text for _, text, _ in items],
+                    [r[0] for r in results],
+                    [r[1] for r in results],
+                )
+
+    def finished():
+        while pending and pending[0].remaining == 0:
+            p = pending.popleft()
+            yield p.song, p.results()
+
+    def song_inputs(segments):
+        """
+        [(cache text, token ids or None, [(position, weight)])] for one song;
+        token ids are None when they are only computed on a cache miss.
+        """
+        if budget is None:
+            return [(text, None, [(pos, 1.0)]) for pos, text in enumerate(segments)]
+        if not segments:
+            return []
+        with stage("tokenize"):
+            if token_cache is not None:
+                line_ids = token_cache.encode(segments)
+            else:
+                line_ids = tokenizer(list(segments), add_special_tokens=False, truncation=False)["input_ids"]
+            windows = plan_windows([len(ids) for ids in line_ids], budget, token_overlap)
+            inputs = window_inputs(line_ids, windows, prefix, suffix)
+        # packed inputs are keyed by their token ids; the prefix keeps them
+        # apart from any lyric line in the shared cache
+        return [
+            (
+                "\x00tokens " + " ".join(map(str, ids)),
+                ids,
+                [(line, float(max(1, e - s))) for line, s, e in spans],
+            )
+            for ids, spans in zip(inputs, windows)
+        ]
+
+    for song in songs:
+        p = _PendingSong(song)
+        pending.append(p)
+        interner.lines += len(song["segments"])
+
+        new = []  # (input id, cache text, token ids) not seen before in this run
+        for text, ids, parts in song_inputs(song["segments"]):
+            sid, hit = interner.intern(text)
+            if hit is not None:
+                p.add(parts, *hit)
+                continue
+            p.remaining += 1
+            if sid in waiters:
+                waiters[sid].append((p, parts))
+            else:
+                waiters[sid] = [(p, parts)]
+                new.append((sid, text, ids))
+
+        todo = new
+        if cache is not None and new:
+            todo = []
+            with stage("cache"):
+                hits = cache.get_many([text for _, text, _ in new])
+            for item, hit in zip(new, hits):
+                if hit is None:
+                    todo.append(item)
+                else:
+                    scatter(item[0], *interner.resolve(item[0], *hit))
+
+        if todo:
+            if budget is None:
+                with stage("tokenize"):
+                    input_ids = tokenize_segments([text for _, text, _ in todo], tokenizer, token_cache)
+                todo = [(sid, text, ids) for (sid, text, _), ids in zip(todo, input_ids)]
+            if metrics is not None:
+                metrics.count("tokens", sum(len(ids) for _, _, ids in todo))
+            pool.extend(todo)
+
+        while len(pool) >= window:
+            run(window)
+        yield from finished()
+
+    # flush whatever is left; this is the only place a batch may be short
+    if pool:
+        run(len(pool))
+    yield from finished()
@@ -0,0 +1,73 @@
+# src/bench_dataset.py
+"""
+Training data path throughput: samples/sec per epoch of the original
+EmotionDataset (per-item tokenization padded to MAX_LENGTH) against
+PretokenizedEmotionDataset (tokenized once, length-bucketed batches,
+dynamic padding). Only the DataLoader is timed, no model.
+
+    python -m src.bench_dataset --n 20000 --epochs 3 --workers 2
+    python -m src.bench_dataset --csv data/labelled.csv
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from torch.utils.data import DataLoader
+
+from .config import BATCH_SIZE, NUM_EPOCHS
+from .dataset import EmotionDataset, PretokenizedEmotionDataset, LengthBucketSampler
+from .bench_utils import write_labelled_csv, timed
+
+def run_epochs(loader, epochs: int, sampler=None):
+    """
+    Returns [(samples/sec, real tokens / padded tokens)] per epoch.
+    """
+    out = []
+    for epoch in range(epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        samples = real = padded = 0
+        start = time.perf_counter()
+        for batch in loader:
+            mask = batch["attention_mask"]
+            samples += mask.shape[0]
+            real += int(mask.sum())
+            padded += mask.numel()
+        out.append((samples / (time.perf_counter() - start), real / max(1, padded)))
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=None, help="labelled text,label CSV (default: synthetic)")
+    parser.add_argument("--n", type=int, default=20_000, help="synthetic samples when no --csv is given")
+    parser.add_argument("--epochs", type=int, default=NUM_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader worker processes")
+    args = parser.parse_args()
+
+    csv_path = args.csv
+    if csv_path is None:
+        csv_path = os.path.join(tempfile.mkdtemp(), "labelled.csv")
+        write_labelled_csv(csv_path, args.n)
+    loader_kwargs = dict(num_workers=args.workers, persistent_workers=args.workers > 0)
+
+    old, old_build = timed(EmotionDataset, csv_path)
+    old_loader = DataLoader(old, batch_size=args.batch_size, shuffle=True, **loader_kwargs)
+    old_epochs = run_epochs(old_loader, args.epochs)
+
+    new, new_build = timed(PretokenizedEmotionDataset, csv_path)
+    sampler = LengthBucketSampler(new.lengths, batch_size=args.batch_size)
+    new_loader = DataLoader(new, batch_sampler=sampler, collate_fn=new.collator(), **loader_kwargs)
+    new_epochs = run_epochs(new_loader, args.epochs, sampler)
+
+    print(f"{len(new)} samples, batch size {args.batch_size}, {args.workers} workers")
+    print(f"  {'dataset':<14} {'build s':>8}  " + "  ".join(f"{'epoch ' + str(e + 1) + ' samples/s':>18}" for e in range(args.epochs)) + "  real/padded tokens")
+    for name, build, epochs in (("per-item", old_build, old_epochs), ("pretokenized", new_build, new_epochs)):
+        rates = "  ".join(f"{rate:18.0f}" for rate, _ in epochs)
+        print(f"  {name:<14} {build:8.2f}  {rates}  {epochs[0][1]:18.1%}")
+    print(f"  speedup (last epoch): {new_epochs[-1][0] / old_epochs[-1][0]:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# src/bench_inference.py
+"""
+Compare segments/sec of batched predict_segments against the old
+one-segment-at-a-time loop, and against token-budget packed inputs
+(lines of every --song-lines consecutive segments packed per song).
+
+    python -m src.bench_inference --n 500 --batch-size 32
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from .config import CSV_PATH, MODEL_DIR, BATCH_SIZE, TOKEN_WINDOW_BUDGET
+from .run_inference import load_model, predict_segments, predict_segments_unbatched
+from .batch_scheduler import iter_song_predictions
+from .segment_dedup import SegmentInterner
+from .bench_utils import synthetic_lines, csv_lines, timed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=500, help="number of segments")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--csv", default=CSV_PATH, help="take segments from this CSV if it exists")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--song-lines", type=int, default=30, help="segments per song for token-budget packing")
+    args = parser.parse_args()
+
+    if os.path.exists(args.csv):
+        segments = csv_lines(args.csv, args.n)
+    else:
+        segments = synthetic_lines(args.n)
+    tokenizer, model, device = load_model(args.model_dir)
+
+    # warm-up so one-off allocations don't skew either side
+    predict_segments(segments[:8], tokenizer, model, device, batch_size=args.batch_size)
+
+    loop_res, loop_t = timed(predict_segments_unbatched, segments, tokenizer, model, device)
+    batch_res, batch_t = timed(
+        predict_segments, segments, tokenizer, model, device, batch_size=args.batch_size
+    )
+
+    songs = [
+        {"segments": segments[i:i + args.song_lines]}
+        for i in range(0, len(segments), args.song_lines)
+    ]
+    interner = SegmentInterner(unit="token windows")
+    windowed, window_t = timed(lambda: [
+        r for _, r in iter_song_predictions(
+            songs, tokenizer, model, device, batch_size=args.batch_size,
+            interner=interner, token_budget=TOKEN_WINDOW_BUDGET,
+        )
+    ])
+    window_labels = [a["label"] for r in windowed for a in r]
+    window_agree = np.mean([a == b["label"] for a, b in zip(window_labels, batch_res)])
+
+    agree = np.mean([a["label"] == b["label"] for a, b in zip(loop_res, batch_res)])
+    max_dev = max(
+        float(np.max(np.abs(np.array(a["probs"]) - np.array(b["probs"]))))
+        for a, b in zip(loop_res, batch_res)
+    )
+
+    print(f"segments:          {len(segments)} (device={device})")
+    print(f"loop:              {len(segments) / loop_t:8.1f} seg/s  ({loop_t:.2f}s)")
+    print(f"batched (bs={args.batch_size}): {len(segments) / batch_t:8.1f} seg/s  ({batch_t:.2f}s)")
+    print(f"speedup:           {loop_t / batch_t:8.2f}x")
+    print(f"token windows:     {len(segments) / window_t:8.1f} seg/s  ({window_t:.2f}s, "
+          f"{interner.unique} model inputs, budget {TOKEN_WINDOW_BUDGET})")
+    print(f"label agreement:   {agree:.4f} (windows vs lines: {window_agree:.4f})")
+    print(f"max |Δprob|:       {max_dev:.2e}")
+
+if __name__ == "__main__":
+    main()
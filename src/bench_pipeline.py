@@ -0,0 +1,198 @@
+# src/bench_pipeline.py
+"""
+Per-stage benchmark of the pipeline on a synthetic lyric corpus, with results
+written as JSON so runs can be compared across commits.
+
+Runs offline by default (stub tokenizer/model, fake LLM client); pass
+--model hf to time the real classifier from --model-dir instead.
+
+    python -m src.bench_pipeline --songs 500
+    python -m src.bench_pipeline --songs 500 --compare outputs/bench/pipeline-abc1234-....json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .config import EMOTIONS, MODEL_DIR, BATCH_SIZE, LEXICON_PATH
+from .bench_utils import (
+    timed,
+    write_synthetic_csv,
+    StubTokenizer,
+    stub_classifier,
+    FakeChatClient,
+)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(args, workdir: str) -> dict:
+    from .segments_from_csv import iter_songs_and_segments_csv
+    from .run_inference import load_model, tokenize_segments, length_sorted_batches, forward_batch
+    from .results_store import SongResults
+    from .word_importance import load_lexicon_matrix, aggregate_song_importance_vectorized
+    from .visualization import plot_emotion_timeline, emotion_wordcloud
+    from .async_summaries import AsyncSummarizer
+
+    stages = {}
+
+    def record(name, seconds, items, unit):
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "items": items,
+            "unit": unit,
+            "per_second": round(items / seconds, 3) if seconds > 0 else None,
+        }
+        print(f"  {name:<20} {seconds:9.3f}s  {items:>8} {unit:<9} "
+              f"{stages[name]['per_second'] or 0:>12.1f} {unit}/s")
+
+    csv_path = os.path.join(workdir, "songs.csv")
+    write_synthetic_csv(csv_path, args.songs, seed=args.seed, verses=args.verses)
+
+    # 1. CSV load + segmentation
+    songs, t = timed(lambda: list(iter_songs_and_segments_csv(csv_path, segment_mode="line")))
+    record("csv_segmentation", t, len(songs), "songs")
+    segment_cache = os.path.join(workdir, "segment_cache")
+    list(iter_songs_and_segments_csv(csv_path, segment_mode="line", cache_dir=segment_cache))
+    cached, t = timed(lambda: list(iter_songs_and_segments_csv(csv_path, segment_mode="line", cache_dir=segment_cache)))
+    record("csv_segment_cached", t, len(cached), "songs")
+    segments = [s for song in songs for s in song["segments"]]
+
+    if args.model == "stub":
+        tokenizer, model, device = StubTokenizer(), stub_classifier(len(EMOTIONS)), "cpu"
+    else:
+        tokenizer, model, device = load_model(args.model_dir)
+
+    # 2. Tokenization
+    input_ids, t = timed(tokenize_segments, segments, tokenizer)
+    record("tokenization", t, len(segments), "segments")
+
+    # 3. Model forward (length-sorted, dynamically padded batches)
+    def forward_all():
+        logits = np.zeros((len(segments), len(EMOTIONS)), dtype=np.float32)
+        probs = np.zeros_like(logits)
+        for batch in length_sorted_batches([len(ids) for ids in input_ids], args.batch_size):
+            logits[batch], probs[batch] = forward_batch(
+                [input_ids[i] for i in batch], tokenizer, model, device
+            )
+        return logits, probs
+    (logits, probs), t = timed(forward_all)
+    record("model_forward", t, len(segments), "segments")
+
+    song_results, start = [], 0
+    for song in songs:
+        n = len(song["segments"])
+        song_results.append(SongResults.from_arrays(
+            song["segments"], logits[start:start + n], probs[start:start + n]
+        ))
+        start += n
+
+    # 4. Word importance
+    lexicon = load_lexicon_matrix(LEXICON_PATH)
+    importances, t = timed(
+        lambda: [aggregate_song_importance_vectorized(r, lexicon) for r in song_results]
+    )
+    record("word_importance", t, len(songs), "songs")
+
+    # 5/6. Rendering (slow, so only the first --render-songs songs)
+    render_dir = os.path.join(workdir, "render")
+    k = min(args.render_songs, len(songs))
+
+    def timelines():
+        for song, results in zip(songs[:k], song_results[:k]):
+            plot_emotion_timeline({**song, "segments": results}, render_dir)
+    _, t = timed(timelines)
+    record("timeline_render", t, k, "songs")
+
+    def wordclouds():
+        for song, importance in zip(songs[:k], importances[:k]):
+            song_id = f"{song['artist_name']} - {song['song_name']}"
+            for e in EMOTIONS:
+                emotion_wordcloud(importance, e, render_dir, song_id)
+    _, t = timed(wordclouds)
+    record("wordcloud_render", t, k, "songs")
+
+    # 7. Summaries against the fake LLM client (prompt building + async fan-out)
+    summary_dir = os.path.join(workdir, "summaries")
+    Path(summary_dir).mkdir()
+
+    def summaries():
+        summarizer = AsyncSummarizer(
+            client=FakeChatClient(latency=args.llm_latency), requests_per_minute=1e9
+        )
+        for i, (song, results, importance) in enumerate(zip(songs, song_results, importances)):
+            song_id = f"{song['artist_name']} - {song['song_name']}"
+            summarizer.submit(song_id, results, importance, os.path.join(summary_dir, f"{i}.txt"))
+        failed = sum(1 for _, r in summarizer.completed(wait=True) if r["error"])
+        summarizer.close()
+        return failed
+    failed, t = timed(summaries)
+    record("llm_summaries", t, len(songs) - failed, "songs")
+
+    return stages
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):")
+    for name, cur in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("per_second") or not cur.get("per_second"):
+            continue
+        ratio = cur["per_second"] / old["per_second"]
+        flag = "  <-- slower" if ratio < 0.9 else ""
+        print(f"  {name:<20} {ratio:6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=200, help="synthetic corpus size")
+    parser.add_argument("--verses", type=int, default=3, help="verses per song (chorus repeats after each)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", choices=["stub", "hf"], default="stub")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--render-songs", type=int, default=10, help="songs to render plots for")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM latency (s)")
+    parser.add_argument("--out", default=None, help="JSON output path (default outputs/bench/...)")
+    parser.add_argument("--compare", default=None, help="earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    print(f"Benchmarking {args.songs} synthetic songs (model={args.model}, commit={commit})")
+    with tempfile.TemporaryDirectory() as workdir:
+        stages = run_benchmarks(args, workdir)
+
+    result = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": vars(args),
+        "stages": stages,
+    }
+    out = args.out or os.path.join(
+        "outputs", "bench", f"pipeline-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    Path(os.path.dirname(out) or ".").mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# src/bench_startup.py
+"""
+Import cost of each entry point, measured in fresh interpreters: wall time
+of `import <module>` (best of --repeat) and which heavy dependencies the
+import pulled in.
+
+    python -m src.bench_startup --repeat 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "src.run_pipeline",
+    "src.segments_from_csv",
+    "src.sharding",
+    "src.arc_index",
+    "src.summary_cache",
+    "src.narrative_llm",
+    "src.inference_server",
+    "src.run_inference",
+]
+
+HEAVY_MODULES = ["torch", "transformers", "matplotlib", "wordcloud", "openai", "onnxruntime"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"module": module, "error": out.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "seconds": min(r["seconds"] for r in runs),
+        "heavy": runs[0]["heavy"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per entry point (best is kept)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    args = parser.parse_args()
+
+    results = [measure(m, args.repeat) for m in args.modules]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"  {'entry point':<26} {'import s':>9}  heavy dependencies loaded")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['module']:<26} {'error':>9}  {r['error']}")
+        else:
+            print(f"  {r['module']:<26} {r['seconds']:9.3f}  {', '.join(r['heavy']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# src/bench_utils.py
+"""
+Shared helpers for the bench_* scripts: synthetic lyrics and corpora,
+timing, and offline stand-ins (stub tokenizer/model, fake LLM client).
+"""
+
+import asyncio
+import csv
+import random
+import time
+import zlib
+from types import SimpleNamespace
+
+WORDS = (
+    "love heart night baby tears fire dance cry alone forever dream light "
+    "dark rain sun broken hold kiss run lost home feel time world never "
+    "again tonight together away wanna gonna sky summer cold burn "
+    "happy sad lonely angry scared party not so very really without"
+).split()
+
+def synthetic_lines(n: int, seed: int = 0, min_words: int = 2, max_words: int = 16):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+        for _ in range(n)
+    ]
+
+def csv_lines(path: str, n: int):
+    """
+    First `n` lyric lines from a songs CSV, read lazily.
+    """
+    from .segments_from_csv import iter_songs_and_segments_csv
+
+    lines = []
+    for song in iter_songs_and_segments_csv(path, segment_mode="line"):
+        lines.extend(song["segments"])
+        if len(lines) >= n:
+            break
+    return lines[:n]
+
+def write_labelled_csv(path: str, n: int, seed: int = 0):
+    """
+    Write a labelled training CSV (text,label) of synthetic lines.
+    """
+    from .config import EMOTIONS
+
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "label"])
+        for line in synthetic_lines(n, seed=seed, max_words=40):
+            writer.writerow([line, rng.choice(EMOTIONS)])
+
+def timed(fn, *args, **kwargs):
+    """
+    Call fn and return (result, elapsed seconds).
+    """
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+GENRES = ["Pop", "Rock", "Sertanejo", "Funk", "Axé", "Romântico", "Samba", "Gospel"]
+
+def synthetic_lyrics(rng: random.Random, verses: int = 3, verse_lines: int = 6, chorus_lines: int = 4) -> str:
+    """
+    Verse/chorus lyrics with the chorus repeated after every verse, blank
+    lines between stanzas.
+    """
+    chorus = synthetic_lines(chorus_lines, seed=rng.randrange(1 << 30))
+    stanzas = []
+    for _ in range(verses):
+        stanzas.append("\n".join(synthetic_lines(verse_lines, seed=rng.randrange(1 << 30))))
+        stanzas.append("\n".join(chorus))
+    return "\n\n".join(stanzas)
+
+def write_synthetic_csv(path: str, n_songs: int, seed: int = 0, verses: int = 3):
+    """
+    Write a songs CSV with the same columns as data/songs.csv.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "artist_name", "song_name", "genres", "language", "lyrics",
+            "artist_popularity", "new_artist_popularity",
+        ])
+        for i in range(n_songs):
+            writer.writerow([
+                f"Artist {i % max(1, n_songs // 10)}",
+                f"Song {i}",
+                "; ".join(rng.sample(GENRES, rng.randint(1, 3))),
+                rng.choice(["en", "pt", "es"]),
+                synthetic_lyrics(rng, verses=verses),
+                rng.randint(0, 100),
+                rng.randint(0, 100),
+            ])
+
+class StubTokenizer:
+    """
+    Offline tokenizer with the parts of the HF interface run_inference uses:
+    whitespace tokens hashed into a small vocab, [CLS]/[SEP] added, truncation.
+    """
+
+    pad_token_id = 0
+    padding_side = "right"
+    vocab_size = 4096
+
+    def _encode(self, text: str, max_length: int, truncation: bool, add_special_tokens: bool):
+        ids = [2 + zlib.crc32(w.encode("utf-8")) % (self.vocab_size - 3) for w in text.lower().split()]
+        if not add_special_tokens:
+            return ids[:max_length] if truncation else ids
+        if truncation:
+            ids = ids[:max(0, max_length - 2)]
+        return [1] + ids + [self.vocab_size - 1]
+
+    def __call__(self, texts, truncation=True, max_length=64, add_special_tokens=True, **kwargs):
+        single = isinstance(texts, str)
+        ids = [
+            self._encode(t, max_length, truncation, add_special_tokens)
+            for t in ([texts] if single else texts)
+        ]
+        return {"input_ids": ids[0] if single else ids}
+
+def stub_classifier(n_labels: int, vocab_size: int = StubTokenizer.vocab_size, dim: int = 64):
+    """
+    Small torch model (embedding bag + 2-layer MLP) callable like an HF
+    sequence classifier: model(input_ids=..., attention_mask=...).logits
+    """
+    import torch
+
+    class StubClassifier(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.embed = torch.nn.Embedding(vocab_size, dim)
+            self.mlp = torch.nn.Sequential(
+                torch.nn.Linear(dim, dim), torch.nn.GELU(), torch.nn.Linear(dim, n_labels)
+            )
+
+        def forward(self, input_ids, attention_mask=None, **kwargs):
+            if attention_mask is None:
+                attention_mask = torch.ones_like(input_ids)
+            mask = attention_mask.unsqueeze(-1).float()
+            pooled = (self.embed(input_ids) * mask).sum(1) / mask.sum(1).clamp(min=1.0)
+            return SimpleNamespace(logits=self.mlp(pooled))
+
+    return StubClassifier().eval()
+
+class FakeChatClient:
+    """
+    Stand-in for AsyncOpenAI: chat.completions.create sleeps `latency`
+    seconds and returns a canned summary. Counts calls.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = f"Synthetic summary ({len(kwargs['messages'][-1]['content'])} prompt chars)."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
@@ -0,0 +1,61 @@
+# src/bench_word_importance.py
+"""
+Micro-benchmark: dict-based aggregate_song_importance vs the array-backed
+aggregate_song_importance_vectorized, plus a numerical parity check.
+
+    python -m src.bench_word_importance --songs 200 --lines 40
+"""
+
+import argparse
+import random
+
+from .config import EMOTIONS, LEXICON_PATH
+from .word_importance import (
+    load_lexicon,
+    compile_lexicon,
+    aggregate_song_importance,
+    aggregate_song_importance_vectorized,
+)
+from .bench_utils import synthetic_lines, timed
+
+def synthetic_song(n_lines: int, seed: int):
+    rng = random.Random(seed)
+    segments = []
+    for i, text in enumerate(synthetic_lines(n_lines, seed=seed), start=1):
+        raw = [rng.random() for _ in EMOTIONS]
+        total = sum(raw)
+        segments.append({"segment_index": i, "text": text, "probs": [p / total for p in raw]})
+    return segments
+
+def max_difference(a, b):
+    worst = 0.0
+    for e in EMOTIONS:
+        if a[e].keys() != b[e].keys():
+            return float("inf")
+        for w, v in a[e].items():
+            worst = max(worst, abs(v - b[e][w]))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--songs", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=40, help="lines per song")
+    args = parser.parse_args()
+
+    lexicon = load_lexicon(LEXICON_PATH)
+    lex_matrix = compile_lexicon(lexicon)
+    songs = [synthetic_song(args.lines, seed) for seed in range(args.songs)]
+
+    ref, loop_t = timed(lambda: [aggregate_song_importance(s, lexicon) for s in songs])
+    vec, vec_t = timed(lambda: [aggregate_song_importance_vectorized(s, lex_matrix) for s in songs])
+
+    worst = max(max_difference(a, b) for a, b in zip(ref, vec))
+    n_segments = args.songs * args.lines
+    print(f"songs x lines:   {args.songs} x {args.lines}")
+    print(f"dict loop:       {n_segments / loop_t:10.1f} seg/s  ({loop_t:.3f}s)")
+    print(f"vectorized:      {n_segments / vec_t:10.1f} seg/s  ({vec_t:.3f}s)")
+    print(f"speedup:         {loop_t / vec_t:10.2f}x")
+    print(f"max |Δscore|:    {worst:.2e}")
+
+if __name__ == "__main__":
+    main()
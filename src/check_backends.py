@@ -0,0 +1,52 @@
+# src/check_backends.py
+"""
+Accuracy/speed check of the CPU inference backends against fp32 PyTorch:
+label agreement, max prob deviation and segments/sec on a sample of lyrics.
+
+    python -m src.check_backends --n 1000 --backends torch,int8,onnx --threads 4
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from .config import CSV_PATH, MODEL_DIR, BATCH_SIZE, INFERENCE_THREADS
+from .run_inference import load_model, predict_segments_columnar
+from .inference_backends import BACKENDS
+from .bench_utils import synthetic_lines, csv_lines, timed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1000, help="number of lyric lines to score")
+    parser.add_argument("--csv", default=CSV_PATH, help="sample lines from this CSV if it exists")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--threads", type=int, default=INFERENCE_THREADS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    segments = csv_lines(args.csv, args.n) if os.path.exists(args.csv) else synthetic_lines(args.n)
+
+    # fp32 reference (always on CPU so the comparison is like for like)
+    tokenizer, model, _ = load_model(args.model_dir, backend="torch", num_threads=args.threads)
+    model.to("cpu")
+    reference = predict_segments_columnar(segments, tokenizer, model, "cpu", batch_size=args.batch_size)
+
+    print(f"{len(segments)} segments, batch size {args.batch_size}, threads {args.threads or 'default'}")
+    print(f"{'backend':<8} {'seg/s':>10} {'label agree':>12} {'max |Δprob|':>12}")
+    for backend in args.backends.split(","):
+        tokenizer, model, device = load_model(args.model_dir, backend=backend, num_threads=args.threads)
+        if backend == "torch":
+            model.to("cpu")
+            device = "cpu"
+        predict_segments_columnar(segments[:args.batch_size], tokenizer, model, device)  # warm-up
+        results, elapsed = timed(
+            predict_segments_columnar, segments, tokenizer, model, device, batch_size=args.batch_size
+        )
+        agree = float(np.mean(results.labels == reference.labels))
+        max_dev = float(np.max(np.abs(results.probs - reference.probs))) if len(results) else 0.0
+        print(f"{backend:<8} {len(segments) / elapsed:>10.1f} {agree:>12.4f} {max_dev:>12.2e}")
+
+if __name__ == "__main__":
+    main()
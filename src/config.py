@@ -7,13 +7,124 @@ EMOTIONS = ["sadness", "joy", "love", "anger", "fear", "surprise"]
 MODEL_NAME = "bhadresh-savani/distilbert-base-uncased-emotion"
 MAX_LENGTH = 64
 BATCH_SIZE = 8
+# Cross-song batching: segments from many songs are pooled and run in
+# windows of BATCH_SIZE * SCHEDULER_WINDOW_BATCHES, sorted by length
+SCHEDULER_WINDOW_BATCHES = 16
 NUM_EPOCHS = 3
 LR = 5e-5
 
+# Inference backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+# (ONNX Runtime, exported once into ONNX_CACHE_DIR); 0 threads = library default
+INFERENCE_BACKEND = "torch"
+INFERENCE_THREADS = 0
+ONNX_CACHE_DIR = "outputs/cache/onnx"
+
+# Inference server (src.inference_server): a micro-batch closes at
+# SERVER_MAX_BATCH_SEGMENTS segments or SERVER_MAX_WAIT_MS after its first request
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_BATCH_SEGMENTS = 64
+SERVER_MAX_WAIT_MS = 5
+
 # Paths (relative to project root)
 CSV_PATH = "data/songs.csv"
+# Songs CSV is streamed in chunks of this many rows; up to CSV_PREFETCH_CHUNKS
+# chunks are parsed ahead in a background thread while inference runs
+CSV_CHUNKSIZE = 2000
+CSV_PREFETCH_CHUNKS = 2
+# Segmented chunks are cached here and reused while the CSV is unchanged;
+# bump SEGMENTATION_VERSION when segmentation/mojibake repair logic changes
+SEGMENT_CACHE_DIR = "outputs/cache/segments"
+SEGMENTATION_VERSION = "1"
 MODEL_DIR = MODEL_NAME
 LEXICON_PATH = "lexicons/emotion_lexicon.csv"
 OUTPUT_TIMELINES = "outputs/timelines"
 OUTPUT_WORDCLOUDS = "outputs/wordclouds"
 OUTPUT_SUMMARIES = "outputs/summaries"
+
+# Columnar per-segment results (memory-mappable .npy parts of about
+# RESULTS_PART_SEGMENTS segments each). Pipeline runs also write a part every
+# RESULTS_CHECKPOINT_SONGS songs or RESULTS_CHECKPOINT_SECONDS seconds, so an
+# interrupted run only redoes the songs since its last checkpoint
+RESULTS_DIR = "outputs/results"
+RESULTS_PART_SEGMENTS = 200_000
+RESULTS_CHECKPOINT_SONGS = 500
+RESULTS_CHECKPOINT_SECONDS = 120
+
+# Timeline/wordcloud/word-importance rendering runs on this many worker
+# processes (0 = inline in the main process), with at most
+# RENDER_MAX_PENDING songs queued at once
+RENDER_WORKERS = 4
+RENDER_MAX_PENDING = 32
+
+# Narrative summaries (OpenAI chat completions). Requests run concurrently in
+# a background event loop, at most LLM_CONCURRENCY in flight and
+# LLM_REQUESTS_PER_MINUTE per minute, retried with backoff up to LLM_MAX_RETRIES
+LLM_MODEL = "gpt-4.1-mini"
+LLM_MAX_TOKENS = 250
+LLM_TEMPERATURE = 0.7
+LLM_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 300
+LLM_MAX_RETRIES = 5
+
+# Summaries are cached by a hash of the full chat request; entries expire
+# after SUMMARY_CACHE_TTL_DAYS and are LRU-evicted past SUMMARY_CACHE_MAX_ENTRIES
+SUMMARY_CACHE_PATH = "outputs/cache/summaries.sqlite"
+SUMMARY_CACHE_TTL_DAYS = 90
+SUMMARY_CACHE_MAX_ENTRIES = 100_000
+
+# Genre x emotion segment counts (reduced over all songs) and how often to
+# re-render the bubble map as a progress snapshot (0 = only at the end)
+GENRE_COUNTS_PATH = "outputs/genre_emotion_counts.csv"
+BUBBLE_SNAPSHOT_EVERY = 0
+
+# Run instrumentation: JSON-lines event stream (start / periodic progress / end)
+RUN_EVENTS_PATH = "outputs/run_events.jsonl"
+PROGRESS_EVERY_SECONDS = 30
+
+# Incremental runs: per-song record of inputs/outputs; bump PIPELINE_VERSION
+# whenever a code change should invalidate previously generated outputs
+MANIFEST_PATH = "outputs/manifest.jsonl"
+PIPELINE_VERSION = "1"
+
+# Emotion-arc similarity index: each song's probability curve resampled to
+# ARC_POINTS points, stored in parts of ARC_PART_SONGS songs
+ARC_INDEX_DIR = "outputs/arc_index"
+ARC_POINTS = 32
+ARC_PART_SONGS = 50_000
+
+# Arc features (src/arc_features.py): smoothed arcs are a centered moving
+# average over ARC_SMOOTH_WINDOW segments; change points are where the
+# smoothed dominant emotion changes
+ARC_SMOOTH_WINDOW = 3
+
+# Sharded runs (--shard i/N) keep their manifest, results, caches and counts
+# under SHARDS_DIR/shard-<i>-of-<N>/ until merged (python -m src.sharding merge)
+SHARDS_DIR = "outputs/shards"
+
+# On-disk cache of segment predictions (LRU-evicted past MAX_ENTRIES rows)
+PREDICTION_CACHE_PATH = "outputs/cache/predictions.sqlite"
+PREDICTION_CACHE_MAX_ENTRIES = 1_000_000
+
+# Repeated segments (choruses) are scored once per run; results of up to
+# SEGMENT_DEDUP_MAX_ENTRIES distinct lines are kept in memory for reuse
+SEGMENT_DEDUP_MAX_ENTRIES = 200_000
+
+# Token-budget mode (run_pipeline --token-windows): consecutive lines are packed
+# into model inputs of up to TOKEN_WINDOW_BUDGET tokens and longer lines are
+# split into pieces overlapping by TOKEN_WINDOW_OVERLAP tokens; predictions
+# are averaged back onto the lines they cover
+TOKEN_WINDOW_BUDGET = MAX_LENGTH
+TOKEN_WINDOW_OVERLAP = 16
+
+# Pre-tokenized segments (src/token_cache.py): ragged int32 token ids per
+# tokenizer setting, written in parts of TOKEN_CACHE_PART_ENTRIES texts;
+# bump TOKENIZATION_VERSION when the text fed to the tokenizer changes
+TOKEN_CACHE_DIR = "outputs/cache/tokens"
+TOKEN_CACHE_PART_ENTRIES = 100_000
+TOKENIZATION_VERSION = "1"
+
+# Training data path (dataset.PretokenizedEmotionDataset): batches are drawn from
+# buckets of LENGTH_BUCKET_BATCHES * BATCH_SIZE shuffled samples sorted by
+# token length, so each batch is padded only to its own longest item
+LENGTH_BUCKET_BATCHES = 50
@@ -0,0 +1,224 @@
+# src/corpus_analytics.py
+"""
+Corpus-level emotion analytics over a results store (no inference).
+
+All current songs are flattened into one table: a label per segment, the
+song each segment belongs to, and per-song metadata. Group-bys are integer
+reductions (np.bincount) over that table, so they run in seconds on
+millions of segments.
+
+    python -m src.corpus_analytics summary
+    python -m src.corpus_analytics by genre --top 20
+    python -m src.corpus_analytics by popularity --buckets 4 --out outputs/pop.csv
+    python -m src.corpus_analytics transitions --by language --group pt
+    python -m src.corpus_analytics thirds --by genre --group Pop
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import arc_features
+from .config import EMOTIONS, RESULTS_DIR
+from .genre_stats import split_genres
+from .results_store import ResultsStore
+
+GROUP_KEYS = ("genre", "language", "artist", "popularity", "new_popularity")
+# quantile-bucketed keys: groups are listed in bucket order, not by size
+BUCKET_KEYS = ("popularity", "new_popularity")
+# group of songs without a value for the key
+UNKNOWN = "(unknown)"
+
+class CorpusTable:
+    """
+    Flattened view of every current song in a results store:
+      labels       int64 (segments,) emotion index per segment
+      offsets      int64 (songs + 1,) segment range of each song
+      seg_song     int64 (segments,) row in `songs` of each segment's song
+      song_counts  int64 (songs, emotions) segments per emotion for each song
+      songs        DataFrame of song metadata, one row per song
+    """
+
+    def __init__(self, root: str = RESULTS_DIR):
+        store = ResultsStore(root)
+        labels, lengths, meta = [], [], []
+        for p, part in enumerate(store.parts):
+            offsets = np.asarray(part["song_offsets"])
+            # only the newest copy of a song counts
+            live = [k for k, song in enumerate(part["songs"]) if store.index[song["song_id"]] == (p, k)]
+            if not live:
+                continue
+            if len(live) == len(part["songs"]):
+                part_labels = np.asarray(part["labels"])
+            else:
+                part_labels = np.concatenate([part["labels"][offsets[k]:offsets[k + 1]] for k in live])
+            labels.append(part_labels)
+            lengths.append(np.diff(offsets)[live])
+            meta.extend(part["songs"][k] for k in live)
+
+        self.labels = np.concatenate(labels).astype(np.int64) if labels else np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(len(meta) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(np.concatenate(lengths), out=self.offsets[1:])
+        self.seg_song = arc_features.song_index(self.offsets)
+        self.songs = pd.DataFrame(meta)
+        self.song_counts = arc_features.label_counts(self.labels, self.offsets)
+
+    def __len__(self):
+        return len(self.songs)
+
+    def group_codes(self, key: str, buckets: int = 4):
+        """
+        (song_idx, codes, names): song `song_idx[i]` belongs to group `codes[i]`.
+        Genres are multi-valued, so a song can appear once per genre.
+        """
+        if key not in GROUP_KEYS:
+            raise ValueError(f"unknown group key {key!r}; expected one of {GROUP_KEYS}")
+        n = len(self.songs)
+        if key == "genre":
+            column = self.songs["genres"] if "genres" in self.songs else pd.Series([None] * n)
+            per_song = [split_genres(g) for g in column]
+            song_idx = np.repeat(np.arange(n), [len(g) for g in per_song])
+            codes, names = pd.factorize(pd.Series([g for gs in per_song for g in gs], dtype=object))
+            return song_idx, codes, list(names)
+        if key in BUCKET_KEYS:
+            column = "artist_popularity" if key == "popularity" else "new_artist_popularity"
+            values = pd.to_numeric(self.songs.get(column, pd.Series([None] * n)), errors="coerce")
+            binned = pd.qcut(values, q=buckets, duplicates="drop")
+            codes = binned.cat.codes.to_numpy().copy()
+            names = [f"q{i + 1} {interval}" for i, interval in enumerate(binned.cat.categories)]
+            missing = codes < 0
+            if missing.any():
+                codes[missing] = len(names)
+                names.append(UNKNOWN)
+            return np.arange(n), codes, names
+        column = "artist_name" if key == "artist" else "language"
+        values = self.songs[column].fillna(UNKNOWN) if column in self.songs else pd.Series([UNKNOWN] * n)
+        codes, names = pd.factorize(values.astype(str))
+        return np.arange(n), codes, list(names)
+
+    def emotion_by(self, key: str, buckets: int = 4) -> pd.DataFrame:
+        """
+        Segments per emotion for each group, with totals and song counts,
+        sorted by segment count (bucketed keys: by bucket, unknown last).
+        """
+        song_idx, codes, names = self.group_codes(key, buckets)
+        counts = np.zeros((len(names), len(EMOTIONS)), dtype=np.int64)
+        np.add.at(counts, codes, self.song_counts[song_idx])
+        df = pd.DataFrame(counts, columns=EMOTIONS)
+        df.insert(0, key, names)
+        df["songs"] = np.bincount(codes, minlength=len(names))
+        df["segments"] = counts.sum(axis=1)
+        if key in BUCKET_KEYS:
+            return df
+        return df.sort_values("segments", ascending=False, kind="stable").reset_index(drop=True)
+
+    def subset(self, key: str = None, group: str = None, buckets: int = 4):
+        """
+        (labels, offsets) of the songs in one group, or of all songs.
+        """
+        if key is None:
+            return self.labels, self.offsets
+        song_idx, codes, names = self.group_codes(key, buckets)
+        if group not in names:
+            raise ValueError(f"no {key} group {group!r}")
+        selected = np.zeros(len(self.songs), dtype=bool)
+        selected[song_idx[codes == names.index(group)]] = True
+        offsets = np.zeros(int(selected.sum()) + 1, dtype=np.int64)
+        np.cumsum(np.diff(self.offsets)[selected], out=offsets[1:])
+        return self.labels[selected[self.seg_song]], offsets
+
+    def transitions(self, key: str = None, group: str = None, buckets: int = 4) -> np.ndarray:
+        """
+        (emotions x emotions) counts of consecutive-segment label pairs within
+        songs, over the whole corpus or the songs of one group.
+        """
+        labels, offsets = self.subset(key, group, buckets)
+        # the whole selection as a single "song", without pairs across songs
+        return arc_features.transition_matrices(labels, offsets).sum(axis=0)
+
+    def thirds(self, key: str = None, group: str = None, buckets: int = 4) -> pd.DataFrame:
+        """
+        Songs whose beginning/middle/end third is dominated by each emotion
+        (by segment labels), over the whole corpus or one group.
+        """
+        labels, offsets = self.subset(key, group, buckets)
+        dominant = arc_features.dominant_thirds(labels, offsets)
+        n_emotions = len(EMOTIONS)
+        counts = np.stack([
+            np.bincount(col[col >= 0], minlength=n_emotions) for col in dominant.T
+        ])
+        return pd.DataFrame(counts, index=arc_features.THIRDS, columns=EMOTIONS)
+
+def distribution_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-emotion counts turned into percentages of each group's segments.
+    """
+    out = df.copy()
+    totals = out["segments"].where(out["segments"] > 0, 1).to_numpy()[:, None]
+    out[EMOTIONS] = (100.0 * out[EMOTIONS].to_numpy() / totals).round(1)
+    return out
+
+def print_transitions(matrix: np.ndarray, title: str):
+    rows = matrix.sum(axis=1, keepdims=True)
+    probs = matrix / np.where(rows > 0, rows, 1)
+    print(f"{title}: {int(matrix.sum())} transitions, "
+          f"{int(matrix.sum() - np.trace(matrix))} emotion changes (row = from, % of row)")
+    print(" " * 10 + "".join(f"{e:>10}" for e in EMOTIONS))
+    for e, row in zip(EMOTIONS, probs):
+        print(f"{e:>10}" + "".join(f"{100 * v:9.1f}%" for v in row))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", default=RESULTS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("summary", help="corpus size and overall emotion distribution")
+    p_by = sub.add_parser("by", help="emotion distribution per group")
+    p_by.add_argument("key", choices=GROUP_KEYS)
+    p_by.add_argument("--top", type=int, default=25, help="largest groups to show (0 = all)")
+    p_by.add_argument("--buckets", type=int, default=4, help="quantile buckets for popularity keys")
+    p_by.add_argument("--counts", action="store_true", help="show segment counts instead of percentages")
+    p_by.add_argument("--out", default=None, help="also write the full table (counts) to this CSV")
+    p_tr = sub.add_parser("transitions", help="emotion transition matrix")
+    p_tr.add_argument("--by", choices=GROUP_KEYS, default=None)
+    p_tr.add_argument("--group", default=None, help="group value, e.g. a genre or language")
+    p_tr.add_argument("--buckets", type=int, default=4)
+    p_th = sub.add_parser("thirds", help="dominant emotion of each song's beginning/middle/end")
+    p_th.add_argument("--by", choices=GROUP_KEYS, default=None)
+    p_th.add_argument("--group", default=None)
+    p_th.add_argument("--buckets", type=int, default=4)
+    args = parser.parse_args()
+
+    table = CorpusTable(args.results)
+    pd.set_option("display.width", 200)
+    if args.command == "summary":
+        totals = table.song_counts.sum(axis=0)
+        n_segments = int(totals.sum())
+        print(f"songs: {len(table)}  segments: {n_segments}")
+        for e, c in zip(EMOTIONS, totals):
+            print(f"  {e:<10} {int(c):>10}  {100 * c / max(1, n_segments):5.1f}%")
+    elif args.command == "by":
+        df = table.emotion_by(args.key, buckets=args.buckets)
+        if args.out:
+            Path(os.path.dirname(args.out) or ".").mkdir(parents=True, exist_ok=True)
+            df.to_csv(args.out, index=False)
+            print(f"Wrote {len(df)} groups to {args.out}")
+        shown = df if args.top == 0 else df.head(args.top)
+        print((shown if args.counts else distribution_table(shown)).to_string(index=False))
+    else:
+        if (args.by is None) != (args.group is None):
+            parser.error("--by and --group go together")
+        title = "all songs" if args.by is None else f"{args.by} = {args.group}"
+        if args.command == "transitions":
+            print_transitions(table.transitions(args.by, args.group, buckets=args.buckets), title)
+        else:
+            counts = table.thirds(args.by, args.group, buckets=args.buckets)
+            songs = counts.sum(axis=1).to_numpy()[:, None]
+            print(f"{title}: % of songs whose part is dominated by each emotion")
+            print((100.0 * counts / np.where(songs > 0, songs, 1)).round(1).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-from torch.utils.data import Dataset
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
 from transformers import AutoTokenizer
 import pandas as pd
-from .config import EMOTIONS, MODEL_NAME, MAX_LENGTH
+from .config import EMOTIONS, MODEL_NAME, MAX_LENGTH, BATCH_SIZE, LENGTH_BUCKET_BATCHES
+from .token_cache import pad_batch
 
 class EmotionDataset(Dataset):
     def __init__(self, csv_path: str):
@@ -31,3 +34,123 @@ class EmotionDataset(Dataset):
         item = {k: v.squeeze(0) for k, v in enc.items()}
         item["labels"] = label
         return item
+
+class PretokenizedEmotionDataset(Dataset):
+    """
+    EmotionDataset tokenized once up front: token ids of all texts live in a
+    ragged int32 buffer (ids[offsets[i]:offsets[i + 1]] is item i) next to an
+    int64 label array. Items are unpadded; use PadCollate and
+    LengthBucketSampler in the DataLoader.
+
+    The tokenizer is only used while building and is not kept, so DataLoader
+    workers receive plain arrays and never load a tokenizer themselves.
+    With a TokenCache, texts tokenized by earlier runs are read back from it.
+    """
+
+    def __init__(self, csv_path: str, tokenizer=None, token_cache=None, chunk: int = 100_000):
+        df = pd.read_csv(csv_path, usecols=["text", "label"])
+        codes = pd.Categorical(df["label"], categories=EMOTIONS).codes
+        if (codes < 0).any():
+            unknown = sorted(set(df["label"][codes < 0].astype(str)))
+            raise ValueError(f"Unknown labels in {csv_path}: {unknown}; expected one of {EMOTIONS}")
+        self.labels = codes.astype(np.int64)
+
+        if tokenizer is None:
+            if token_cache is not None:
+                tokenizer = token_cache.tokenizer
+            else:
+                from .run_inference import load_tokenizer
+                tokenizer = load_tokenizer()
+        self.pad_id = tokenizer.pad_token_id
+        self.left = getattr(tokenizer, "padding_side", "right") == "left"
+
+        texts = df["text"].fillna("").astype(str).tolist()
+        if token_cache is not None:
+            self.ids, self.offsets = token_cache.encode_ragged(texts)
+        else:
+            seqs = []
+            for start in range(0, len(texts), chunk):
+                enc = tokenizer(texts[start:start + chunk], truncation=True, max_length=MAX_LENGTH)
+                seqs.extend(np.asarray(ids, dtype=np.int32) for ids in enc["input_ids"])
+            self.offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+            np.cumsum([len(s) for s in seqs], out=self.offsets[1:])
+            self.ids = np.concatenate(seqs) if seqs else np.zeros(0, dtype=np.int32)
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        return {
+            "input_ids": self.ids[self.offsets[idx]:self.offsets[idx + 1]],
+            "labels": self.labels[idx],
+        }
+
+    def collator(self) -> "PadCollate":
+        return PadCollate(self.pad_id, self.left)
+
+class PadCollate:
+    """
+    DataLoader collate_fn for unpadded items: pads each batch to its longest
+    item (dynamic padding) and builds the attention mask.
+    """
+
+    def __init__(self, pad_id: int, left: bool = False):
+        self.pad_id = pad_id
+        self.left = left
+
+    def __call__(self, items):
+        ids, mask = pad_batch([item["input_ids"] for item in items], self.pad_id, self.left)
+        return {
+            "input_ids": torch.from_numpy(ids),
+            "attention_mask": torch.from_numpy(mask),
+            "labels": torch.tensor(np.array([item["labels"] for item in items]), dtype=torch.long),
+        }
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler that keeps batches of similar token length: each epoch the
+    items are shuffled, cut into buckets of `bucket_batches` batches, sorted
+    by length inside a bucket and split into batches, and the batch order is
+    shuffled again. Call set_epoch() for a new order every epoch.
+    """
+
+    def __init__(
+        self,
+        lengths,
+        batch_size: int = BATCH_SIZE,
+        bucket_batches: int = LENGTH_BUCKET_BATCHES,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        seed: int = 0,
+    ):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket = batch_size * max(1, bucket_batches)
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        n = len(self.lengths)
+        order = rng.permutation(n) if self.shuffle else np.arange(n)
+        batches = []
+        for start in range(0, n, self.bucket):
+            bucket = order[start:start + self.bucket]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size:
+            batches.pop()
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
+    def __len__(self):
+        n = len(self.lengths)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
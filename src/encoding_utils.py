@@ -3,9 +3,18 @@ def fix_mojibake(s: str) -> str:
     Fix strings like 'AxÃ©' -> 'Axé' when mis-decoded.
     If it's already fine, returns original text.
     """
-    if not isinstance(s, str):
+    if not isinstance(s, str) or s.isascii():
         return s
     try:
         return s.encode("latin1").decode("utf-8")
     except (UnicodeEncodeError, UnicodeDecodeError):
         return s
+
+def fix_mojibake_column(values) -> list:
+    """
+    fix_mojibake over a whole column (Series, array or list), returned as a list.
+    Pure-ASCII values (most rows of an English dump) are passed through untouched.
+    """
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    return [fix_mojibake(v) if isinstance(v, str) and not v.isascii() else v for v in values]
@@ -0,0 +1,93 @@
+# src/genre_stats.py
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import EMOTIONS
+
+UNKNOWN_GENRE = "(unknown)"
+
+def split_genres(raw_genres):
+    """
+    Split a multi-genre string like "Pop; Axé; Romântico".
+    Missing/empty genres map to ["(unknown)"].
+    """
+    if not isinstance(raw_genres, str):
+        return [UNKNOWN_GENRE]
+    genres = [g.strip() for g in raw_genres.split(";") if g.strip()]
+    return genres or [UNKNOWN_GENRE]
+
+class GenreEmotionCounts:
+    """
+    Genre x emotion matrix of segment counts, built up song by song
+    and persisted as CSV (one row per genre, one column per emotion).
+    """
+
+    def __init__(self):
+        self.genres = []
+        self.index = {}
+        self.counts = np.zeros((16, len(EMOTIONS)), dtype=np.int64)
+
+    def _row(self, genre: str) -> int:
+        i = self.index.get(genre)
+        if i is None:
+            i = len(self.genres)
+            if i == len(self.counts):
+                grown = np.zeros((2 * len(self.counts), len(EMOTIONS)), dtype=np.int64)
+                grown[:i] = self.counts
+                self.counts = grown
+            self.genres.append(genre)
+            self.index[genre] = i
+        return i
+
+    def add(self, genres, counts):
+        """
+        Add one song's per-emotion segment counts (dict or array in EMOTIONS order)
+        to each of its genres.
+        """
+        if isinstance(counts, dict):
+            counts = [counts.get(e, 0) for e in EMOTIONS]
+        counts = np.asarray(counts, dtype=np.int64)
+        for g in genres:
+            self.counts[self._row(g)] += counts
+
+    def merge(self, other: "GenreEmotionCounts"):
+        for g, row in zip(other.genres, other.matrix()):
+            self.counts[self._row(g)] += row
+
+    def matrix(self) -> np.ndarray:
+        return self.counts[:len(self.genres)]
+
+    def to_dicts(self):
+        """
+        (genre_emotion_counts, genre_total_segments) in the shape
+        plot_genre_emotion_bubble expects.
+        """
+        m = self.matrix()
+        emotion_counts = {
+            g: {e: int(m[i, j]) for j, e in enumerate(EMOTIONS)}
+            for i, g in enumerate(self.genres)
+        }
+        totals = {g: int(m[i].sum()) for i, g in enumerate(self.genres)}
+        return emotion_counts, totals
+
+    def save(self, path: str):
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        df = pd.DataFrame(self.matrix(), columns=EMOTIONS)
+        df.insert(0, "genre", self.genres)
+        tmp = path + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "GenreEmotionCounts":
+        stats = cls()
+        if not os.path.exists(path):
+            return stats
+        df = pd.read_csv(path, keep_default_na=False)
+        for _, row in df.iterrows():
+            stats.add([row["genre"]], [int(row[e]) for e in EMOTIONS])
+        return stats
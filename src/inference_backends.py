@@ -0,0 +1,154 @@
+# src/inference_backends.py
+"""
+Optional CPU inference backends for the emotion classifier:
+  "torch" - the fp32 PyTorch model as loaded
+  "int8"  - PyTorch dynamic int8 quantization of the Linear layers
+  "onnx"  - ONNX export run with ONNX Runtime (export cached on disk)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from types import SimpleNamespace
+
+import torch
+
+from .config import ONNX_CACHE_DIR
+
+BACKENDS = ("torch", "int8", "onnx")
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization: Linear weights stored as int8, activations
+    quantized on the fly. CPU only.
+    """
+    model = model.to("cpu")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+# files whose change means the exported graph is stale
+_MODEL_FILES = ("config.json", "model.safetensors", "pytorch_model.bin")
+
+def _package_version(name: str):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+def export_fingerprint(model_dir: str, model=None) -> str:
+    """
+    Short hash of what an ONNX export depends on: the weight/config files of
+    a local model dir (size and mtime) or the hub revision, plus the torch,
+    onnx and onnxruntime versions.
+    """
+    if os.path.isdir(model_dir):
+        files = {}
+        for name in _MODEL_FILES:
+            path = os.path.join(model_dir, name)
+            if os.path.exists(path):
+                st = os.stat(path)
+                files[name] = [st.st_size, st.st_mtime_ns]
+        weights = files
+    else:
+        weights = getattr(getattr(model, "config", None), "_commit_hash", None)
+    raw = json.dumps({
+        "weights": weights,
+        "torch": torch.__version__,
+        "onnx": _package_version("onnx"),
+        "onnxruntime": _package_version("onnxruntime"),
+    }, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def onnx_path_for(model_dir: str, cache_dir: str = ONNX_CACHE_DIR, model=None) -> str:
+    safe = model_dir.strip("/").replace("/", "__").replace("\\", "__")
+    return os.path.join(cache_dir, safe, export_fingerprint(model_dir, model), "model.onnx")
+
+def export_onnx(model, model_dir: str, cache_dir: str = ONNX_CACHE_DIR) -> str:
+    """
+    Export the classifier to ONNX (dynamic batch and sequence axes) unless a
+    cached export for the current weights and library versions of
+    `model_dir` already exists. Returns the .onnx path.
+    """
+    path = onnx_path_for(model_dir, cache_dir, model)
+    if os.path.exists(path):
+        return path
+    export_dir = os.path.dirname(path)
+    Path(export_dir).mkdir(parents=True, exist_ok=True)
+
+    model = model.to("cpu").eval()
+    dummy_ids = torch.ones((2, 8), dtype=torch.long)
+    dummy_mask = torch.ones((2, 8), dtype=torch.long)
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    # unique temp name: concurrent runs (shards) may export the same model
+    fd, tmp = tempfile.mkstemp(dir=export_dir, suffix=".onnx.tmp")
+    os.close(fd)
+    try:
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (dummy_ids, dummy_mask),
+            tmp,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    # the pre-fingerprint layout (<model>/model.onnx) is never read again;
+    # other fingerprint dirs are left alone, another run may be using them
+    legacy = os.path.join(os.path.dirname(export_dir), "model.onnx")
+    try:
+        os.remove(legacy)
+    except FileNotFoundError:
+        pass
+    return path
+
+class OnnxSequenceClassifier:
+    """
+    Wraps an ONNX Runtime session so it can be called like the HF model:
+    model(input_ids=..., attention_mask=...).logits (a torch tensor).
+    """
+
+    def __init__(self, onnx_path: str, num_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise ImportError(
+                'backend="onnx" needs onnxruntime (pip install onnx onnxruntime)'
+            ) from exc
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def eval(self):
+        return self
+
+    def __call__(self, **inputs):
+        feed = {
+            k: v.cpu().numpy() for k, v in inputs.items() if k in self.input_names
+        }
+        (logits,) = self.session.run(["logits"], feed)
+        return SimpleNamespace(logits=torch.from_numpy(logits))
@@ -0,0 +1,196 @@
+# src/inference_server.py
+"""
+Long-running HTTP inference service: the model is loaded once and
+concurrent requests are merged into micro-batches.
+
+    python -m src.inference_server --port 8765 --max-wait-ms 5
+
+    POST /predict  {"segments": ["line 1", "line 2"]}
+               or  {"lyrics": "full lyrics text", "segment_mode": "line"}
+      -> {"segments": [{"segment_index", "text", "logits", "probs", "label"}, ...]}
+    GET  /health   -> {"status": "ok", ...}
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import (
+    MODEL_DIR,
+    BATCH_SIZE,
+    INFERENCE_BACKEND,
+    INFERENCE_THREADS,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_BATCH_SEGMENTS,
+    SERVER_MAX_WAIT_MS,
+)
+from .run_inference import load_model, predict_segments_columnar
+from .segments_from_csv import segment_lyrics
+
+class MicroBatcher:
+    """
+    Collects segment lists from concurrent callers into one model call.
+
+    A batch is closed as soon as it holds `max_batch_segments` segments or
+    `max_wait_ms` has passed since its first request arrived, whichever
+    comes first; it then runs through predict_segments_columnar (length-sorted,
+    dynamically padded) and each caller gets back its own SongResults.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        device,
+        max_batch_segments: int = SERVER_MAX_BATCH_SEGMENTS,
+        max_wait_ms: float = SERVER_MAX_WAIT_MS,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.max_batch_segments = max_batch_segments
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_size = batch_size
+        self.requests = queue.Queue()
+        self.batches_run = 0
+        self.segments_run = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, segments) -> Future:
+        future = Future()
+        self.requests.put((list(segments), future))
+        return future
+
+    def predict(self, segments):
+        return self.submit(segments).result()
+
+    def _collect(self):
+        jobs = [self.requests.get()]
+        n = len(jobs[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n < self.max_batch_segments:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            n += len(job[0])
+        return jobs
+
+    def _loop(self):
+        while True:
+            jobs = self._collect()
+            segments = [s for job_segments, _ in jobs for s in job_segments]
+            try:
+                results = predict_segments_columnar(
+                    segments, self.tokenizer, self.model, self.device, batch_size=self.batch_size
+                )
+            except Exception as exc:
+                for _, future in jobs:
+                    future.set_exception(exc)
+                continue
+            self.batches_run += 1
+            self.segments_run += len(segments)
+
+            records = results.to_records()
+            start = 0
+            for job_segments, future in jobs:
+                own = records[start:start + len(job_segments)]
+                for i, rec in enumerate(own, start=1):
+                    rec["segment_index"] = i
+                future.set_result(own)
+                start += len(job_segments)
+
+def make_handler(batcher: MicroBatcher):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send(404, {"error": "not found"})
+            self._send(200, {
+                "status": "ok",
+                "batches_run": batcher.batches_run,
+                "segments_run": batcher.segments_run,
+            })
+
+        def do_POST(self):
+            if self.path != "/predict":
+                return self._send(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if "segments" in body:
+                    segments = [str(s) for s in body["segments"]]
+                elif "lyrics" in body:
+                    segments = segment_lyrics(body["lyrics"], mode=body.get("segment_mode", "line"))
+                else:
+                    return self._send(400, {"error": 'expected "segments" or "lyrics"'})
+            except (ValueError, TypeError) as exc:
+                return self._send(400, {"error": f"bad request: {exc}"})
+
+            if not segments:
+                return self._send(200, {"segments": []})
+            try:
+                records = batcher.predict(segments)
+            except Exception as exc:
+                return self._send(500, {"error": str(exc)})
+            self._send(200, {"segments": records})
+
+        def log_message(self, fmt, *args):
+            # keep the console quiet under load; errors still surface via responses
+            pass
+
+    return Handler
+
+def make_server(batcher: MicroBatcher, host: str = SERVER_HOST, port: int = SERVER_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default=INFERENCE_BACKEND)
+    parser.add_argument("--threads", type=int, default=INFERENCE_THREADS)
+    parser.add_argument("--max-batch", type=int, default=SERVER_MAX_BATCH_SEGMENTS,
+                        help="close a micro-batch at this many segments")
+    parser.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS,
+                        help="close a micro-batch this long after its first request")
+    args = parser.parse_args()
+
+    tokenizer, model, device = load_model(args.model_dir, backend=args.backend, num_threads=args.threads)
+    batcher = MicroBatcher(
+        tokenizer, model, device, max_batch_segments=args.max_batch, max_wait_ms=args.max_wait_ms
+    )
+    server = make_server(batcher, args.host, args.port)
+    print(f"Serving emotion predictions on http://{args.host}:{args.port} (backend={args.backend})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# src/instrumentation.py
+
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import RUN_EVENTS_PATH, PROGRESS_EVERY_SECONDS
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+class RunMetrics:
+    """
+    Per-stage timers and counters for one pipeline run, streamed as JSON lines
+    to `events_path` ("run_start", periodic "progress", "run_end") and printed
+    as a summary table at the end.
+
+    with metrics.stage("forward"): ...   accumulates wall time per stage
+    metrics.count("segments", n)          accumulates a counter
+
+    If `profile_stage` names a stage, every entry into that stage runs under
+    one cProfile profiler, dumped to `<profile_dir>/profile-<stage>.prof`
+    (pstats format; open with snakeviz or `python -m pstats`).
+    """
+
+    def __init__(self, events_path: str = RUN_EVENTS_PATH, profile_stage: str = None, profile_dir: str = "outputs"):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.profiler = cProfile.Profile() if profile_stage else None
+        self._last_progress = self.started
+
+        self._fh = None
+        if events_path:
+            Path(os.path.dirname(events_path) or ".").mkdir(parents=True, exist_ok=True)
+            self._fh = open(events_path, "a", encoding="utf-8")
+        self.event("run_start", pid=os.getpid(), argv=sys.argv)
+
+    def event(self, kind: str, **fields):
+        if self._fh is None:
+            return
+        record = {"run_id": self.run_id, "event": kind, "time": time.time(), **fields}
+        self._fh.write(json.dumps(record, default=str) + "\n")
+        self._fh.flush()
+
+    @contextmanager
+    def stage(self, name: str):
+        profiling = self.profiler is not None and name == self.profile_stage
+        if profiling:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - start
+            self.stage_calls[name] += 1
+            if profiling:
+                self.profiler.disable()
+
+    def timed_iter(self, iterable, name: str):
+        """
+        Wrap a (lazy) iterator so the time spent producing each item counts toward `name`.
+        """
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_time(self, name: str, seconds: float):
+        """
+        Account time measured elsewhere (e.g. inside a worker process) to a stage.
+        """
+        self.stage_seconds[name] += seconds
+        self.stage_calls[name] += 1
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def tick(self):
+        """
+        Emit a "progress" event if PROGRESS_EVERY_SECONDS have passed.
+        """
+        now = time.perf_counter()
+        if now - self._last_progress >= PROGRESS_EVERY_SECONDS:
+            self._last_progress = now
+            self.event("progress", **self.snapshot())
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        segments = self.counters.get("segments", 0)
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "segments_per_s": round(segments / elapsed, 2) if elapsed > 0 else 0.0,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "counters": dict(self.counters),
+            "stages": {k: round(v, 4) for k, v in self.stage_seconds.items()},
+        }
+
+    def print_summary(self):
+        snap = self.snapshot()
+        elapsed = snap["elapsed_s"]
+        print("\nRun summary")
+        print(f"  {'stage':<22} {'seconds':>10} {'calls':>8} {'% wall':>7}")
+        for name, seconds in sorted(self.stage_seconds.items(), key=lambda kv: -kv[1]):
+            share = 100.0 * seconds / elapsed if elapsed else 0.0
+            print(f"  {name:<22} {seconds:>10.2f} {self.stage_calls[name]:>8} {share:>6.1f}%")
+        print(f"  {'counter':<22} {'value':>10}")
+        for name, value in sorted(self.counters.items()):
+            print(f"  {name:<22} {value:>10}")
+        print(f"  wall time {elapsed:.2f}s, {snap['segments_per_s']:.1f} segments/s, "
+              f"peak RSS {snap['peak_rss_mb']:.0f} MB")
+
+    def close(self):
+        if self.profiler is not None:
+            Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"profile-{self.profile_stage}.prof")
+            self.profiler.dump_stats(path)
+            print(f"cProfile data for stage {self.profile_stage!r} written to {path}")
+        self.event("run_end", **self.snapshot())
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
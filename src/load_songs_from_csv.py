@@ -1,4 +1,11 @@
 import pandas as pd
+from .config import CSV_CHUNKSIZE
+
+# Columns the pipeline actually uses; anything else in the CSV is never parsed
+SONG_COLUMNS = [
+    "artist_name", "song_name", "genres", "language", "lyrics",
+    "artist_popularity", "new_artist_popularity",
+]
 
 def load_song_df(path: str) -> pd.DataFrame:
     """
@@ -9,6 +16,14 @@ def load_song_df(path: str) -> pd.DataFrame:
     df = pd.read_csv(path)  # standard CSV
     return df
 
+def iter_song_chunks(path: str, chunksize: int = CSV_CHUNKSIZE, columns=SONG_COLUMNS):
+    """
+    Stream the songs CSV as DataFrames of at most `chunksize` rows,
+    parsing only `columns` (missing optional columns are simply absent).
+    """
+    wanted = set(columns)
+    yield from pd.read_csv(path, usecols=lambda c: c in wanted, chunksize=chunksize)
+
 if __name__ == "__main__":
     df = load_song_df("data/songs.csv")
     print("Columns:", df.columns.tolist())
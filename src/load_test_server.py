@@ -0,0 +1,74 @@
+# src/load_test_server.py
+"""
+Load test for src.inference_server: concurrent clients POST synthetic lyric
+lines and we report p50/p99 latency and throughput.
+
+    python -m src.load_test_server --url http://127.0.0.1:8765 --clients 16 --requests 50
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from .config import SERVER_HOST, SERVER_PORT
+from .bench_utils import synthetic_lines, timed
+
+def post_json(url: str, payload: dict, timeout: float = 60.0):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://{SERVER_HOST}:{SERVER_PORT}")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client threads")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--segments", type=int, default=4, help="lyric lines per request")
+    args = parser.parse_args()
+
+    endpoint = args.url.rstrip("/") + "/predict"
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(cid: int):
+        for r in range(args.requests):
+            lines = synthetic_lines(args.segments, seed=cid * 100_003 + r)
+            try:
+                out, elapsed = timed(post_json, endpoint, {"segments": lines})
+                assert len(out["segments"]) == len(lines)
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+                continue
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000.0
+    print(f"requests:     {len(latencies)} ok, {len(errors)} failed in {wall:.2f}s")
+    if len(lat_ms):
+        print(f"latency p50:  {np.percentile(lat_ms, 50):8.1f} ms")
+        print(f"latency p99:  {np.percentile(lat_ms, 99):8.1f} ms")
+        print(f"throughput:   {len(latencies) / wall:8.1f} req/s, "
+              f"{len(latencies) * args.segments / wall:8.1f} seg/s")
+    if errors:
+        print("first error:", errors[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# src/manifest.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def song_row_hash(song) -> str:
+    """
+    Hash of everything in a song row that affects its outputs:
+    metadata, genres and the segmented lyrics.
+    """
+    payload = [
+        song["artist_name"],
+        song["song_name"],
+        song["genres"],
+        song["language"],
+        song["artist_popularity"],
+        song["new_artist_popularity"],
+        song["segments"],
+    ]
+    raw = json.dumps(payload, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def run_fingerprint(model_name: str, lexicon_path: str, code_version: str) -> str:
+    """
+    Identifies the settings outputs were produced with; any change makes every song dirty.
+    """
+    raw = f"{model_name}\0{file_hash(lexicon_path)}\0{code_version}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class Manifest:
+    """
+    Append-only JSON-lines record of what was produced for each song:
+      {"song_id", "row_hash", "fingerprint", "outputs": [...],
+       "genres": [...], "counts": {emotion: n_segments}}
+
+    Entries are appended (and flushed) as songs finish, so an interrupted run
+    keeps everything completed so far; the last entry per song wins on load.
+    `compact()` rewrites the file with one line per song.
+    """
+
+    def __init__(self, path: str, fingerprint: str, readonly: bool = False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.readonly = readonly
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a crash can leave a half-written last line
+                        continue
+                    self.entries[entry["song_id"]] = entry
+        self._fh = None
+        if not readonly:
+            Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+            self._fh = open(path, "a", encoding="utf-8")
+
+    def get(self, song_id: str):
+        return self.entries.get(song_id)
+
+    def is_current(self, song_id: str, row_hash: str) -> bool:
+        """
+        True if the song was produced from the same row with the same settings
+        and all of its recorded outputs still exist.
+        """
+        entry = self.entries.get(song_id)
+        if entry is None:
+            return False
+        if entry["row_hash"] != row_hash or entry["fingerprint"] != self.fingerprint:
+            return False
+        return all(os.path.exists(p) for p in entry["outputs"])
+
+    def record(self, song_id: str, row_hash: str, outputs, genres, counts):
+        entry = {
+            "song_id": song_id,
+            "row_hash": row_hash,
+            "fingerprint": self.fingerprint,
+            "outputs": list(outputs),
+            "genres": list(genres),
+            "counts": dict(counts),
+        }
+        self.record_entry(entry)
+
+    def record_entry(self, entry: dict):
+        """
+        Append an already-built entry as is (e.g. when merging shard manifests).
+        """
+        self.entries[entry["song_id"]] = entry
+        self._fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def compact(self):
+        self._fh.close()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        if self.readonly:
+            return
+        self.compact()
+        self._fh.close()
@@ -0,0 +1,157 @@
+# src/prediction_cache.py
+
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from .config import (
+    MODEL_NAME,
+    MAX_LENGTH,
+    PREDICTION_CACHE_PATH,
+    PREDICTION_CACHE_MAX_ENTRIES,
+)
+
+def normalize_segment(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFC unicode, collapsed whitespace.
+    Case is kept, since a cased model would score "Love" and "love" differently.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+class PredictionCache:
+    """
+    On-disk (SQLite) cache of segment logits/probs, keyed by
+    (model name, MAX_LENGTH, normalized segment text).
+
+    Entries carry a last-used timestamp; once the table grows past
+    `max_entries` the least recently used rows are evicted.
+    """
+
+    # run an eviction pass every this many inserts (and on close)
+    EVICT_EVERY = 10_000
+
+    def __init__(
+        self,
+        path: str = PREDICTION_CACHE_PATH,
+        model_name: str = MODEL_NAME,
+        max_length: int = MAX_LENGTH,
+        max_entries: int = PREDICTION_CACHE_MAX_ENTRIES,
+    ):
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts_since_evict = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY,"
+            " logits BLOB NOT NULL,"
+            " probs BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions(last_used)"
+        )
+        self.conn.commit()
+
+    def key(self, text: str) -> str:
+        raw = f"{self.model_name}\0{self.max_length}\0{normalize_segment(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Look up a list of segment texts.
+        Returns a list aligned with `texts`: (logits, probs) float32 arrays, or None on a miss.
+        """
+        keys = [self.key(t) for t in texts]
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # stay well below SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, logits, probs FROM predictions WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for k, logits, probs in rows:
+                found[k] = (
+                    np.frombuffer(logits, dtype=np.float32),
+                    np.frombuffer(probs, dtype=np.float32),
+                )
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE predictions SET last_used = ? WHERE key = ?",
+                [(now, k) for k in found],
+            )
+            self.conn.commit()
+
+        out = [found.get(k) for k in keys]
+        n_hit = sum(1 for o in out if o is not None)
+        self.hits += n_hit
+        self.misses += len(out) - n_hit
+        return out
+
+    def put_many(self, texts, logits, probs):
+        """
+        Store predictions for `texts`; logits/probs are (len(texts), emotions) arrays.
+        """
+        if len(texts) == 0:
+            return
+        logits = np.asarray(logits, dtype=np.float32)
+        probs = np.asarray(probs, dtype=np.float32)
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions (key, logits, probs, last_used) VALUES (?, ?, ?, ?)",
+            [
+                (self.key(t), logits[i].tobytes(), probs[i].tobytes(), now)
+                for i, t in enumerate(texts)
+            ],
+        )
+        self.conn.commit()
+
+        self._inserts_since_evict += len(texts)
+        if self._inserts_since_evict >= self.EVICT_EVERY:
+            self.evict()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def evict(self):
+        """
+        Drop least recently used rows until at most max_entries remain.
+        Returns the number of rows removed.
+        """
+        self._inserts_since_evict = 0
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM predictions WHERE key IN ("
+            " SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self.conn.commit()
+        return excess
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Prediction cache: {self.hits} hits, {self.misses} misses ({rate:.1%} hit rate)"
+
+    def close(self):
+        self.evict()
+        self.conn.close()
@@ -0,0 +1,116 @@
+# src/render_pool.py
+
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import EMOTIONS, OUTPUT_TIMELINES, OUTPUT_WORDCLOUDS, RENDER_WORKERS, RENDER_MAX_PENDING
+from .word_importance import aggregate_song_importance_vectorized
+
+# lexicon handed to each worker once, at start-up
+_worker_lexicon = None
+
+def _init_worker(lexicon):
+    global _worker_lexicon
+    import matplotlib
+    matplotlib.use("Agg")
+    _worker_lexicon = lexicon
+
+def render_song(song_id, song_result, lexicon=None):
+    """
+    CPU-bound post-inference work for one song: word importance, timeline
+    plot and per-emotion word clouds. Output paths depend only on the song,
+    so they are the same whichever worker runs it.
+
+    Returns {"song_id", "importance", "outputs", "error", "seconds"}; any exception is
+    caught and reported in "error" so one bad song never stops the others.
+    """
+    from .visualization import plot_emotion_timeline, emotion_wordcloud
+
+    lexicon = lexicon if lexicon is not None else _worker_lexicon
+    start = time.perf_counter()
+    try:
+        outputs = [plot_emotion_timeline(song_result, OUTPUT_TIMELINES)]
+        importance = aggregate_song_importance_vectorized(song_result["segments"], lexicon)
+        for e in EMOTIONS:
+            wc_path = emotion_wordcloud(importance, e, OUTPUT_WORDCLOUDS, song_id)
+            if wc_path:
+                outputs.append(wc_path)
+        error = None
+    except Exception:
+        import matplotlib.pyplot as plt
+        plt.close("all")  # don't leak a half-drawn figure into the next song
+        importance, outputs, error = None, [], traceback.format_exc()
+    return {
+        "song_id": song_id,
+        "importance": importance,
+        "outputs": outputs,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+    }
+
+class RenderPool:
+    """
+    Runs render_song for finished songs on a pool of worker processes
+    (spawned, Agg backend). With workers=0 everything runs inline.
+
+    submit() takes a song plus an arbitrary `context` object that is handed
+    back untouched; completed() yields (context, result) in submission order.
+    At most `max_pending` songs are in flight; submit blocks beyond that.
+    """
+
+    def __init__(self, lexicon, workers: int = RENDER_WORKERS, max_pending: int = RENDER_MAX_PENDING):
+        self.lexicon = lexicon
+        self.max_pending = max(1, max_pending)
+        self.pending = deque()
+        self.ready = deque()
+        self.executor = None
+        if workers > 0:
+            # children inherit this, so matplotlib never picks a GUI backend there
+            os.environ.setdefault("MPLBACKEND", "Agg")
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(lexicon,),
+            )
+
+    def submit(self, song_id, song_result, context=None):
+        if self.executor is None:
+            self.ready.append((context, render_song(song_id, song_result, self.lexicon)))
+            return
+        while len(self.pending) >= self.max_pending:
+            self.ready.append(self._collect(*self.pending.popleft()))
+        future = self.executor.submit(render_song, song_id, song_result)
+        self.pending.append((song_id, context, future))
+
+    @staticmethod
+    def _collect(song_id, context, future):
+        try:
+            return context, future.result()
+        except Exception:
+            # the worker itself died (e.g. killed); only this song is lost
+            return context, {
+                "song_id": song_id,
+                "importance": None,
+                "outputs": [],
+                "error": traceback.format_exc(),
+                "seconds": 0.0,
+            }
+
+    def completed(self, wait: bool = False):
+        """
+        Yield (context, result) for songs that are done, oldest first.
+        With wait=True, block until every submitted song has finished.
+        """
+        while self.pending and (wait or self.pending[0][2].done()):
+            self.ready.append(self._collect(*self.pending.popleft()))
+        while self.ready:
+            yield self.ready.popleft()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,319 @@
+# src/results_store.py
+
+import json
+import os
+import shutil
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from .config import EMOTIONS, RESULTS_DIR, RESULTS_PART_SEGMENTS
+
+class SegmentView(Mapping):
+    """
+    Read-only dict-like view of one segment in a SongResults, with the same keys
+    as the dicts from predict_segments ("segment_index", "text", "logits",
+    "probs", "label"). "logits"/"probs" are numpy row views, not lists.
+    """
+
+    __slots__ = ("_song", "_i")
+    _KEYS = ("segment_index", "text", "logits", "probs", "label")
+
+    def __init__(self, song: "SongResults", i: int):
+        self._song = song
+        self._i = i
+
+    def __getitem__(self, key):
+        song, i = self._song, self._i
+        if key == "segment_index":
+            return i + 1
+        if key == "text":
+            return song.text(i)
+        if key == "logits":
+            return song.logits[i]
+        if key == "probs":
+            return song.probs[i]
+        if key == "label":
+            return EMOTIONS[song.labels[i]]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+class SongResults:
+    """
+    Columnar segment results for one song:
+      logits, probs  float32 (segments, emotions)
+      labels         int8 (segments,) index into EMOTIONS
+      text_bytes     uint8 buffer of UTF-8 segment texts
+      text_offsets   int64 (segments + 1,) byte offsets into text_bytes
+                     (segment i's text is text_bytes[text_offsets[i]:text_offsets[i + 1]])
+    The arrays may be memory-mapped slices of a ResultsStore part (no copies).
+
+    Iterating (or indexing) yields SegmentView objects, so code written against
+    the old list-of-dicts results keeps working.
+    """
+
+    __slots__ = ("logits", "probs", "labels", "text_bytes", "text_offsets")
+
+    def __init__(self, logits, probs, labels, text_bytes, text_offsets):
+        self.logits = logits
+        self.probs = probs
+        self.labels = labels
+        self.text_bytes = text_bytes
+        self.text_offsets = text_offsets
+
+    @classmethod
+    def from_arrays(cls, texts, logits, probs) -> "SongResults":
+        probs = np.asarray(probs, dtype=np.float32)
+        encoded = [t.encode("utf-8") for t in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(
+            logits=np.asarray(logits, dtype=np.float32),
+            probs=probs,
+            labels=probs.argmax(axis=1).astype(np.int8) if len(probs) else np.zeros(0, dtype=np.int8),
+            text_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            text_offsets=offsets,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [SegmentView(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return SegmentView(self, i)
+
+    def __iter__(self):
+        return (SegmentView(self, i) for i in range(len(self)))
+
+    def text(self, i: int) -> str:
+        start, end = self.text_offsets[i], self.text_offsets[i + 1]
+        return self.text_bytes[start:end].tobytes().decode("utf-8")
+
+    @property
+    def texts(self):
+        return [self.text(i) for i in range(len(self))]
+
+    @property
+    def label_names(self):
+        return [EMOTIONS[i] for i in self.labels]
+
+    def label_counts(self) -> np.ndarray:
+        return np.bincount(self.labels, minlength=len(EMOTIONS))
+
+    def to_records(self):
+        """
+        The list-of-dicts format returned by predict_segments.
+        """
+        return [
+            {
+                "segment_index": i + 1,
+                "text": self.text(i),
+                "logits": self.logits[i].tolist(),
+                "probs": self.probs[i].tolist(),
+                "label": EMOTIONS[self.labels[i]],
+            }
+            for i in range(len(self))
+        ]
+
+_PART_ARRAYS = ("logits", "probs", "labels", "text_bytes", "text_offsets", "song_offsets")
+
+def part_names(root: str):
+    """
+    Complete part directories under `root` (part-00000, part-00001, ...), in order.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(p for p in os.listdir(root) if p.startswith("part-") and "." not in p)
+
+class PartWriter:
+    """
+    Base of the append-only part writers (results store, arc index): rows are
+    buffered in memory and flush() writes them as the next numbered part
+    <root>/part-<n>. Subclasses implement _reset() (empty the buffer),
+    __len__() (rows buffered) and _write(part_dir) (write the buffer's files).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        Path(root).mkdir(parents=True, exist_ok=True)
+        self.next_part = 1 + max((int(p[5:]) for p in part_names(root)), default=-1)
+        self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def _write(self, part_dir: str):
+        raise NotImplementedError
+
+    def flush(self):
+        if not len(self):
+            return
+        name = f"part-{self.next_part:05d}"
+        tmp = os.path.join(self.root, name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        self._write(tmp)
+        # a part only becomes visible once it is complete
+        os.replace(tmp, os.path.join(self.root, name))
+
+        self.next_part += 1
+        self._reset()
+
+    def close(self):
+        self.flush()
+
+class ResultsWriter(PartWriter):
+    """
+    Appends SongResults to a results directory as numbered parts:
+
+      <root>/part-00000/{logits,probs,labels,text_bytes,text_offsets,song_offsets}.npy
+      <root>/part-00000/songs.jsonl   (one {"song_id", ...meta} per song, in order)
+
+    Segments of consecutive songs are concatenated; song_offsets[k]:song_offsets[k+1]
+    is song k's segment range and text_offsets are relative to the part's
+    text buffer. A part is flushed once it holds `part_segments` segments.
+
+    Checkpoints: with `checkpoint_songs` / `checkpoint_seconds` set, a part is
+    also flushed once it holds that many songs or that long after the last
+    flush. `on_flush(song_ids)` is called once a part is on disk, e.g. to
+    record those songs as done.
+    """
+
+    def __init__(
+        self,
+        root: str = RESULTS_DIR,
+        part_segments: int = RESULTS_PART_SEGMENTS,
+        checkpoint_songs: int = None,
+        checkpoint_seconds: float = None,
+        on_flush=None,
+    ):
+        self.part_segments = part_segments
+        self.checkpoint_songs = checkpoint_songs
+        self.checkpoint_seconds = checkpoint_seconds
+        self.on_flush = on_flush
+        super().__init__(root)
+
+    def _reset(self):
+        self.songs = []
+        self.results = []
+        self.n_segments = 0
+        self.started = time.monotonic()
+
+    def __len__(self):
+        return len(self.songs)
+
+    def add(self, song_id: str, results: SongResults, meta=None):
+        self.songs.append({"song_id": song_id, **(meta or {})})
+        self.results.append(results)
+        self.n_segments += len(results)
+        if (
+            self.n_segments >= self.part_segments
+            or (self.checkpoint_songs and len(self.songs) >= self.checkpoint_songs)
+            or (self.checkpoint_seconds and time.monotonic() - self.started >= self.checkpoint_seconds)
+        ):
+            self.flush()
+
+    def flush(self):
+        song_ids = [song["song_id"] for song in self.songs]
+        super().flush()
+        if song_ids and self.on_flush is not None:
+            self.on_flush(song_ids)
+
+    def _write(self, part_dir: str):
+        song_offsets = np.zeros(len(self.results) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in self.results], out=song_offsets[1:])
+
+        # offsets of a song read back from a store are absolute in its part's
+        # buffer, so rebase each song's slice onto this part's buffer
+        text_chunks, text_offsets = [], [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for r in self.results:
+            start, end = int(r.text_offsets[0]), int(r.text_offsets[-1])
+            text_chunks.append(r.text_bytes[start:end])
+            text_offsets.append(np.asarray(r.text_offsets[1:], dtype=np.int64) - start + base)
+            base += end - start
+
+        arrays = {
+            "logits": np.concatenate([r.logits for r in self.results]).astype(np.float32, copy=False),
+            "probs": np.concatenate([r.probs for r in self.results]).astype(np.float32, copy=False),
+            "labels": np.concatenate([r.labels for r in self.results]).astype(np.int8, copy=False),
+            "text_bytes": np.concatenate(text_chunks).astype(np.uint8, copy=False),
+            "text_offsets": np.concatenate(text_offsets),
+            "song_offsets": song_offsets,
+        }
+        for key, arr in arrays.items():
+            np.save(os.path.join(part_dir, f"{key}.npy"), arr)
+        with open(os.path.join(part_dir, "songs.jsonl"), "w", encoding="utf-8") as f:
+            for song in self.songs:
+                f.write(json.dumps(song, ensure_ascii=False, default=str) + "\n")
+
+class ResultsStore:
+    """
+    Read side of a results directory. Part arrays are memory-mapped, and
+    get() returns SongResults whose arrays are views into them.
+    When a song appears in several parts (reruns), the newest part wins.
+    """
+
+    def __init__(self, root: str = RESULTS_DIR):
+        self.root = root
+        self.parts = []
+        self.index = {}  # song_id -> (part number, position in part)
+        for name in part_names(root):
+            part_dir = os.path.join(root, name)
+            arrays = {
+                key: np.load(os.path.join(part_dir, f"{key}.npy"), mmap_mode="r")
+                for key in _PART_ARRAYS
+            }
+            with open(os.path.join(part_dir, "songs.jsonl"), encoding="utf-8") as f:
+                songs = [json.loads(line) for line in f if line.strip()]
+            arrays["songs"] = songs
+            for k, song in enumerate(songs):
+                self.index[song["song_id"]] = (len(self.parts), k)
+            self.parts.append(arrays)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, song_id):
+        return song_id in self.index
+
+    def song_ids(self):
+        return list(self.index)
+
+    def meta(self, song_id: str) -> dict:
+        p, k = self.index[song_id]
+        return self.parts[p]["songs"][k]
+
+    def get(self, song_id: str) -> SongResults:
+        p, k = self.index[song_id]
+        part = self.parts[p]
+        start, end = int(part["song_offsets"][k]), int(part["song_offsets"][k + 1])
+        return SongResults(
+            logits=part["logits"][start:end],
+            probs=part["probs"][start:end],
+            labels=part["labels"][start:end],
+            text_bytes=part["text_bytes"],
+            text_offsets=part["text_offsets"][start:end + 1],
+        )
+
+    def __iter__(self):
+        """
+        Yields (song_id, meta, SongResults) for every current song.
+        """
+        for song_id in self.index:
+            yield song_id, self.meta(song_id), self.get(song_id)
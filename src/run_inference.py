@@ -1,11 +1,62 @@
 # src/run_inference.py
 
-import torch
-import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from .config import EMOTIONS, MODEL_NAME, MAX_LENGTH
+# torch / transformers are imported inside the functions that need them, so
+# importing this module (and the pipeline) stays cheap until a model is used
+import numpy as np
+from .config import (
+    EMOTIONS,
+    MODEL_NAME,
+    MAX_LENGTH,
+    BATCH_SIZE,
+    INFERENCE_BACKEND,
+    INFERENCE_THREADS,
+)
+from .results_store import SongResults
+from .prediction_cache import normalize_segment
+from .token_cache import pad_batch
+
+def load_model(model_dir, backend: str = INFERENCE_BACKEND, num_threads: int = INFERENCE_THREADS):
+    """
+    backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+             (ONNX Runtime; int8/onnx always run on CPU)
+    num_threads: intra-op CPU threads (0 = library default)
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    from .inference_backends import BACKENDS, quantize_int8, export_onnx, OnnxSequenceClassifier
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    tokenizer = load_tokenizer()
+
+    # Load the classification model (HF hub or local dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+
+    # Make sure model has a pad token id
+    if getattr(model.config, "pad_token_id", None) is None:
+        model.config.pad_token_id = tokenizer.pad_token_id
+
+    if backend == "int8":
+        model = quantize_int8(model)
+        device = torch.device("cpu")
+    elif backend == "onnx":
+        model = OnnxSequenceClassifier(export_onnx(model, model_dir), num_threads=num_threads)
+        device = torch.device("cpu")
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model.to(device)
+    model.eval()
+    return tokenizer, model, device
+
+def load_tokenizer():
+    """
+    Fast tokenizer for the model, with a pad token guaranteed.
+    """
+    from transformers import AutoTokenizer
 
-def load_model(model_dir):
     # Load tokenizer for the chosen model
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
 
@@ -16,20 +67,113 @@ def load_model(model_dir):
             tokenizer.pad_token = tokenizer.eos_token
         else:
             tokenizer.pad_token = tokenizer.cls_token
+    return tokenizer
 
-    # Load the classification model (HF hub or local dir)
-    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+def tokenize_segments(segments, tokenizer, token_cache=None):
+    """
+    Tokenize all segments in one call (truncated to MAX_LENGTH, no padding).
+    Returns a list of input id lists, one per segment. With a TokenCache,
+    previously seen segments are read back instead of tokenized.
+    """
+    if token_cache is not None:
+        return token_cache.encode(segments)
+    enc = tokenizer(
+        list(segments),
+        truncation=True,
+        max_length=MAX_LENGTH,
+    )
+    return enc["input_ids"]
 
-    # Make sure model has a pad token id
-    if getattr(model.config, "pad_token_id", None) is None:
-        model.config.pad_token_id = tokenizer.pad_token_id
+def length_sorted_batches(lengths, batch_size: int = BATCH_SIZE):
+    """
+    Group item indices into batches of similar length so each batch
+    only needs padding up to its own longest member.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model.to(device)
-    model.eval()
-    return tokenizer, model, device
+def forward_batch(input_ids, tokenizer, model, device):
+    """
+    Pad one batch of token id lists to its longest member and run the model.
+    Returns (logits, probs) as float32 numpy arrays of shape (batch, emotions).
+    """
+    import torch
+    import torch.nn.functional as F
+
+    left = getattr(tokenizer, "padding_side", "right") == "left"
+    ids, mask = (torch.from_numpy(a) for a in pad_batch(input_ids, tokenizer.pad_token_id, left))
+
+    with torch.no_grad():
+        logits = model(input_ids=ids.to(device), attention_mask=mask.to(device)).logits
+        probs = F.softmax(logits, dim=-1)
+    return logits.float().cpu().numpy(), probs.float().cpu().numpy()
+
+def predict_segments_columnar(
+    segments, tokenizer, model, device, batch_size: int = BATCH_SIZE, cache=None, token_cache=None
+):
+    """
+    Batched inference: tokenize every segment at once, sort by token length
+    and run the model on batches of `batch_size`, each padded only to its
+    longest member. Returns a SongResults in the original segment order.
+
+    Repeated segments (same text after normalize_segment) are scored once
+    and copied to every occurrence.
+
+    If a PredictionCache is given, cached segments skip the model and new
+    predictions are written back to it; a TokenCache supplies token ids.
+    """
+    segments = list(segments)
+
+    # first position of each distinct segment, and every position's distinct index
+    first, where = {}, []
+    for i, text in enumerate(segments):
+        where.append(first.setdefault(normalize_segment(text), i))
+    distinct = list(first.values())
+
+    logits = np.zeros((len(segments), len(EMOTIONS)), dtype=np.float32)
+    probs = np.zeros((len(segments), len(EMOTIONS)), dtype=np.float32)
+
+    todo = distinct
+    if cache is not None:
+        todo = []
+        for i, hit in zip(distinct, cache.get_many([segments[i] for i in distinct])):
+            if hit is None:
+                todo.append(i)
+            else:
+                logits[i], probs[i] = hit
+
+    if todo:
+        input_ids = tokenize_segments([segments[i] for i in todo], tokenizer, token_cache)
+        for batch in length_sorted_batches([len(ids) for ids in input_ids], batch_size):
+            batch_logits, batch_probs = forward_batch(
+                [input_ids[j] for j in batch], tokenizer, model, device
+            )
+            rows = [todo[j] for j in batch]
+            logits[rows] = batch_logits
+            probs[rows] = batch_probs
+        if cache is not None:
+            cache.put_many([segments[i] for i in todo], logits[todo], probs[todo])
+
+    logits, probs = logits[where], probs[where]
+    return SongResults.from_arrays(segments, logits, probs)
+
+def predict_segments(segments, tokenizer, model, device, batch_size: int = BATCH_SIZE, cache=None):
+    """
+    Same as predict_segments_columnar, returned as a list of per-segment dicts
+    (segment_index, text, logits, probs, label).
+    """
+    return predict_segments_columnar(
+        segments, tokenizer, model, device, batch_size=batch_size, cache=cache
+    ).to_records()
+
+def predict_segments_unbatched(segments, tokenizer, model, device):
+    """
+    Reference implementation: one forward pass per segment, padded to MAX_LENGTH.
+    Kept for benchmarking and parity checks against predict_segments.
+    """
+    import torch
+    import torch.nn.functional as F
 
-def predict_segments(segments, tokenizer, model, device):
     results = []
     for idx, text in enumerate(segments, start=1):
         enc = tokenizer(
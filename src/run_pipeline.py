@@ -1,51 +1,333 @@
+import argparse
 import os
 from pathlib import Path
 from .config import (
     CSV_PATH,
+    CSV_PREFETCH_CHUNKS,
+    SEGMENT_CACHE_DIR,
+    TOKEN_WINDOW_BUDGET,
+    TOKEN_WINDOW_OVERLAP,
+    MODEL_NAME,
     MODEL_DIR,
     LEXICON_PATH,
     OUTPUT_TIMELINES,
     OUTPUT_WORDCLOUDS,
     OUTPUT_SUMMARIES,
+    RENDER_WORKERS,
+    INFERENCE_BACKEND,
+    INFERENCE_THREADS,
+    MANIFEST_PATH,
+    GENRE_COUNTS_PATH,
+    BUBBLE_SNAPSHOT_EVERY,
+    PIPELINE_VERSION,
+    RUN_EVENTS_PATH,
+    RESULTS_DIR,
+    RESULTS_CHECKPOINT_SONGS,
+    RESULTS_CHECKPOINT_SECONDS,
+    ARC_INDEX_DIR,
+    PREDICTION_CACHE_PATH,
+    SUMMARY_CACHE_PATH,
     EMOTIONS,
 )
-from .segments_from_csv import load_songs_and_segments_csv
-from .run_inference import load_model, predict_segments
-from .word_importance import load_lexicon, aggregate_song_importance
-from .visualization import plot_emotion_timeline, emotion_wordcloud
-from .narrative_llm import summarize_song
-from collections import defaultdict
+from .segments_from_csv import iter_songs_and_segments_csv
+from .run_inference import load_model
+from .batch_scheduler import iter_song_predictions
+from .prediction_cache import PredictionCache
+from .segment_dedup import SegmentInterner
+from .token_cache import TokenCache
+from .results_store import ResultsStore, ResultsWriter
+from .arc_index import ArcWriter
+from .arc_features import ArcFeatures
+from .manifest import Manifest, run_fingerprint, song_row_hash
+from .word_importance import load_lexicon_matrix, aggregate_song_importance_vectorized
+from .render_pool import RenderPool
+from .async_summaries import AsyncSummarizer
+from .summary_cache import SummaryCache
+from .genre_stats import GenreEmotionCounts, split_genres
+from .instrumentation import RunMetrics
+from .sharding import parse_shard, shard_of, shard_paths, mark_done
 
-def run_pipeline():
-    Path(OUTPUT_TIMELINES).mkdir(parents=True, exist_ok=True)
-    Path(OUTPUT_WORDCLOUDS).mkdir(parents=True, exist_ok=True)
-    Path(OUTPUT_SUMMARIES).mkdir(parents=True, exist_ok=True)
+# Pipeline stages, in order; --stages picks a subset
+#   segment    stream + segment the CSV (fills the segment cache)
+#   infer      model predictions -> results store, arc index, genre counts
+#   render     word importance, timelines and word clouds
+#   summarize  narrative LLM summaries
+# Without "infer", render/summarize read predictions from the results store.
+STAGES = ("segment", "infer", "render", "summarize")
 
-    # 1. Load songs + segments from CSV
-    songs = load_songs_and_segments_csv(CSV_PATH, segment_mode="line")
-    print(f"Loaded {len(songs)} songs from {CSV_PATH}")
+def parse_stages(spec: str):
+    """
+    "all" or a comma list such as "segment", "infer" or "render,summarize".
+    """
+    if spec == "all":
+        return set(STAGES)
+    stages = {s.strip() for s in spec.split(",") if s.strip()}
+    unknown = stages - set(STAGES)
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(
+            f"unknown stages {sorted(unknown)}; choose from {', '.join(STAGES)} or 'all'"
+        )
+    return stages | {"segment"}
+
+def render_genre_bubble(genre_stats: GenreEmotionCounts):
+    from .visualization import plot_genre_emotion_bubble
+
+    genre_emotion_counts, genre_total_segments = genre_stats.to_dicts()
+    plot_genre_emotion_bubble(
+        genre_emotion_counts,
+        genre_total_segments,
+        OUTPUT_TIMELINES,
+        top_n=25  # max genres to show
+    )
+
+def run_pipeline(
+    incremental: bool = False,
+    render_workers: int = RENDER_WORKERS,
+    llm_client=None,
+    backend: str = INFERENCE_BACKEND,
+    num_threads: int = INFERENCE_THREADS,
+    events_path: str = RUN_EVENTS_PATH,
+    profile_stage: str = None,
+    shard=None,
+    token_windows: bool = False,
+    stages=STAGES,
+):
+    """
+    llm_client: optional async chat client for summaries (defaults to AsyncOpenAI).
+    backend / num_threads: inference backend and CPU threads, see load_model.
+    events_path / profile_stage: instrumentation, see RunMetrics.
+    shard: (index, count) to process only that shard of the catalog; shard runs
+      always resume from their own manifest and are combined by src.sharding merge.
+    token_windows: pack lines into TOKEN_WINDOW_BUDGET-token model inputs (long
+      lines split with overlap) instead of one input per line; results stay per line.
+    stages: subset of STAGES to run. Heavy dependencies (torch/transformers,
+      matplotlib/wordcloud, openai) are only imported by the stages that use
+      them. The manifest (and a shard's done marker) is only written when every
+      stage runs, since only then are all of a song's outputs present.
+    """
+    stages = set(stages)
+    full_run = stages >= set(STAGES)
+    infer, render, summarize = "infer" in stages, "render" in stages, "summarize" in stages
+    paths = {
+        "manifest": MANIFEST_PATH,
+        "results": RESULTS_DIR,
+        "arc_index": ARC_INDEX_DIR,
+        "genre_counts": GENRE_COUNTS_PATH,
+        "events": events_path,
+        "prediction_cache": PREDICTION_CACHE_PATH,
+        "summary_cache": SUMMARY_CACHE_PATH,
+    }
+    if shard is not None:
+        shard_index, shard_count = shard
+        paths = shard_paths(shard_index, shard_count)
+        Path(paths["dir"]).mkdir(parents=True, exist_ok=True)
+        if full_run and os.path.exists(paths["done"]):
+            os.remove(paths["done"])
+        incremental = True
+        print(f"Running shard {shard_index}/{shard_count} in {paths['dir']}")
+
+    metrics = RunMetrics(events_path=paths["events"], profile_stage=profile_stage)
+
+    if render:
+        Path(OUTPUT_TIMELINES).mkdir(parents=True, exist_ok=True)
+        Path(OUTPUT_WORDCLOUDS).mkdir(parents=True, exist_ok=True)
+    if summarize:
+        Path(OUTPUT_SUMMARIES).mkdir(parents=True, exist_ok=True)
+        if llm_client is None and not os.environ.get("OPENAI_API_KEY"):
+            print("Warning: OPENAI_API_KEY is not set; only cached summaries can be produced")
+
+    # 1. Stream songs + segments from CSV (parsed chunk by chunk, ahead of inference)
+    songs = metrics.timed_iter(
+        iter_songs_and_segments_csv(
+            CSV_PATH, segment_mode="line",
+            prefetch_chunks=CSV_PREFETCH_CHUNKS, cache_dir=SEGMENT_CACHE_DIR,
+        ),
+        "load_segment",
+    )
+    print(f"Streaming songs from {CSV_PATH}")
+
+    # GLOBAL: genre x emotion segment counts, reduced over all songs
+    genre_stats = GenreEmotionCounts()
+
+    # quantized predictions differ slightly, so they are cached/tracked separately
+    model_key = MODEL_NAME if backend == "torch" else f"{MODEL_NAME}@{backend}"
+    # Manifest of what each song's outputs were built from (always written,
+    # only consulted for skipping when running incrementally)
+    code_version = PIPELINE_VERSION
+    if token_windows:
+        code_version += f"+windows{TOKEN_WINDOW_BUDGET}/{TOKEN_WINDOW_OVERLAP}"
+    manifest = Manifest(paths["manifest"], run_fingerprint(model_key, LEXICON_PATH, code_version))
+
+    # manifest entries are only written once the song's results part is on
+    # disk (see results_flushed); the store check also covers older manifests
+    stored = ResultsStore(paths["results"]) if incremental else None
+
+    def dirty_songs():
+        seen = skipped = 0
+        for song in songs:
+            if shard is not None and shard_of(song["artist_name"], song["song_name"], shard_count) != shard_index:
+                continue
+            seen += 1
+            metrics.count("songs")
+            song_id = f"{song['artist_name']} - {song['song_name']}"
+            row_hash = song_row_hash(song)
+            if incremental and manifest.is_current(song_id, row_hash) and song_id in stored:
+                # unchanged: reuse its stored counts for the genre aggregates
+                entry = manifest.get(song_id)
+                genre_stats.add(entry["genres"], entry["counts"])
+                skipped += 1
+                metrics.count("skipped_songs")
+                continue
+            yield song
+        print(f"Loaded {seen} songs from {CSV_PATH}")
+        if incremental:
+            print(f"Skipped {skipped} up-to-date songs")
+
+    if stages == {"segment"}:
+        # segment-only: stream (and cache) the segmented CSV, nothing else
+        for song in dirty_songs():
+            metrics.count("segments", len(song["segments"]))
+            metrics.tick()
+        manifest.close()
+        metrics.print_summary()
+        metrics.close()
+        return
+
+    # 2. Load lexicon (array-backed for vectorized word importance)
+    lexicon = load_lexicon_matrix(LEXICON_PATH) if render or summarize else None
+
+    # Results reach disk in parts (at least every RESULTS_CHECKPOINT_SONGS songs),
+    # so a finished song's manifest entry waits in `deferred` until its part is
+    # written; a crash then never leaves entries for songs missing from the store
+    unflushed, deferred = set(), {}
+
+    def results_flushed(song_ids):
+        # keep the arc index in step with the results store
+        arc_writer.flush()
+        for song_id in song_ids:
+            unflushed.discard(song_id)
+            entry = deferred.pop(song_id, None)
+            if entry is not None:
+                manifest.record(song_id, *entry)
+
+    if infer:
+        # 3. Load classifier (directly from HuggingFace hub or local dir)
+        with metrics.stage("load_model"):
+            tokenizer, model, device = load_model(MODEL_DIR, backend=backend, num_threads=num_threads)
+
+        # 4. Prediction cache: repeated lines (choruses, reruns) skip the model
+        cache = PredictionCache(paths["prediction_cache"], model_name=model_key)
+        # repeated lines within the run (choruses) are scored once
+        interner = SegmentInterner(unit="token windows" if token_windows else "segments")
+        # token ids of every line seen by any earlier run (shared across shards)
+        if token_windows:
+            token_cache = TokenCache(tokenizer, max_length=None, add_special_tokens=False)
+        else:
+            token_cache = TokenCache(tokenizer)
+
+        # 5. Columnar results store (memory-mappable, read back with ResultsStore)
+        results_writer = ResultsWriter(
+            paths["results"],
+            checkpoint_songs=RESULTS_CHECKPOINT_SONGS,
+            checkpoint_seconds=RESULTS_CHECKPOINT_SECONDS,
+            on_flush=results_flushed,
+        )
+        # emotion-arc similarity index, grown as songs are processed
+        arc_writer = ArcWriter(paths["arc_index"])
+
+    # 6. Worker pool for the CPU-bound per-song rendering
+    render_pool = RenderPool(lexicon, workers=render_workers) if render else None
 
-    # GLOBAL: genre-emotion stats
-    genre_emotion_counts = defaultdict(lambda: {e: 0 for e in EMOTIONS})
-    genre_total_segments = defaultdict(int)
+    # 7. Narrative summaries are generated concurrently in the background
+    if summarize:
+        summary_cache = SummaryCache(paths["summary_cache"])
+        summarizer = AsyncSummarizer(client=llm_client, cache=summary_cache)
 
-    # 2. Load classifier (directly from HuggingFace hub or local dir)
-    tokenizer, model, device = load_model(MODEL_DIR)
+    processed = 0
 
-    # 3. Load lexicon
-    lexicon = load_lexicon(LEXICON_PATH)
+    def song_done(song, song_id, song_genres, song_counts, outputs):
+        nonlocal processed
+        if full_run:
+            entry = (song_row_hash(song), outputs, song_genres, song_counts)
+            if song_id in unflushed:
+                deferred[song_id] = entry
+            else:
+                manifest.record(song_id, *entry)
 
-    for song in songs:
+        processed += 1
+        metrics.count("songs_completed")
+        if infer and BUBBLE_SNAPSHOT_EVERY and shard is None and processed % BUBBLE_SNAPSHOT_EVERY == 0:
+            with metrics.stage("bubble_render"):
+                render_genre_bubble(genre_stats)
+
+    def submit_summary(song, song_id, seg_results, arc, importance, song_genres, song_counts, outputs):
+        # Module 3: narrative summary (written to disk as soon as it arrives)
+        safe_id = song_id.replace(" ", "_")
+        summary_path = os.path.join(OUTPUT_SUMMARIES, f"{safe_id}_summary.txt")
+        summarizer.submit(
+            song_id, seg_results, importance, summary_path,
+            context=(song, song_id, song_genres, song_counts, outputs), arc=arc,
+        )
+
+    def rendered_song(context, rendered):
+        song, song_id, seg_results, arc, song_genres, song_counts = context
+        metrics.add_time("render (workers)", rendered["seconds"])
+        if rendered["error"]:
+            print(f"  Rendering failed for {song_id}:\n{rendered['error']}")
+            metrics.count("render_failures")
+            return
+        if summarize:
+            submit_summary(
+                song, song_id, seg_results, arc, rendered["importance"],
+                song_genres, song_counts, rendered["outputs"],
+            )
+        else:
+            song_done(song, song_id, song_genres, song_counts, rendered["outputs"])
+
+    def summarized_song(context, summarized):
+        song, song_id, song_genres, song_counts, outputs = context
+        metrics.add_time("llm_summary (async)", summarized["seconds"])
+        if summarized["error"]:
+            print(f"  Summary failed for {song_id}:\n{summarized['error']}")
+            metrics.count("summary_failures")
+            return
+        print("  Summary written to:", summarized["path"])
+        song_done(song, song_id, song_genres, song_counts, outputs + [summarized["path"]])
+
+    def stored_predictions():
+        # render/summarize without inference: reuse the results store
+        store = ResultsStore(paths["results"])
+        for song in dirty_songs():
+            song_id = f"{song['artist_name']} - {song['song_name']}"
+            if song_id not in store:
+                print(f"  No stored results for {song_id} (run the infer stage first)")
+                metrics.count("missing_results")
+                continue
+            yield song, store.get(song_id)
+
+    # Module 1: segment-level emotion, batched across song boundaries
+    if infer:
+        predictions = iter_song_predictions(
+            dirty_songs(), tokenizer, model, device,
+            cache=cache, metrics=metrics, interner=interner, token_cache=token_cache,
+            token_budget=TOKEN_WINDOW_BUDGET if token_windows else None,
+        )
+    else:
+        predictions = stored_predictions()
+    for song, seg_results in predictions:
         song_id = f"{song['artist_name']} - {song['song_name']}"
         print(f"Processing: {song_id}")
 
-        segments = song["segments"]
-        if not segments:
+        if not seg_results:
             print("  (no lyrics, skipping)")
+            metrics.count("empty_songs")
             continue
+        metrics.count("segments", len(seg_results))
+
+        # arc features once per song, shared by stats, timeline and summary
+        with metrics.stage("arc_features"):
+            arc = ArcFeatures.of_song(seg_results)
 
-        # Module 1: segment-level emotion
-        seg_results = predict_segments(segments, tokenizer, model, device)
         song_result = {
             "artist_name": song["artist_name"],
             "song_name": song["song_name"],
@@ -53,48 +335,157 @@ def run_pipeline():
             "language": song["language"],
             "artist_popularity": song["artist_popularity"],
             "new_artist_popularity": song["new_artist_popularity"],
-            "segments": seg_results
+            "segments": seg_results,
+            "arc": arc,
         }
 
         # split multi-genre string like "Pop; Axé; Romântico"
-        raw_genres = song["genres"] or ""
-        song_genres = [g.strip() for g in raw_genres.split(";") if g.strip()]
-        if not song_genres:
-            song_genres = ["(unknown)"]
-
-        for seg in seg_results:
-            label = seg["label"]
-            for g in song_genres:
-                genre_emotion_counts[g][label] += 1
-                genre_total_segments[g] += 1
-
-        # After processing all songs, plot genre-emotion bubble map
-        from .visualization import plot_genre_emotion_bubble
-
-        print("Building genre-emotion bubble map...")
-        plot_genre_emotion_bubble(
-            genre_emotion_counts,
-            genre_total_segments,
-            OUTPUT_TIMELINES,
-            top_n=25  # max genres to show
-        )
-        print("Genre-emotion bubble saved.")
+        song_genres = split_genres(song["genres"])
 
-        # Plot timeline
-        plot_emotion_timeline(song_result, OUTPUT_TIMELINES)
+        label_counts = arc.label_counts[0]
+        song_counts = {e: int(c) for e, c in zip(EMOTIONS, label_counts)}
 
-        # Module 2: word-level importance + word clouds
-        song_importance = aggregate_song_importance(seg_results, lexicon)
-        for e in EMOTIONS:
-            emotion_wordcloud(song_importance, e, OUTPUT_WORDCLOUDS, song_id)
+        if infer:
+            genre_stats.add(song_genres, label_counts)
+            with metrics.stage("results_write"):
+                # arc first: a results flush also flushes the arc index
+                arc_writer.add(song_id, seg_results.probs)
+                unflushed.add(song_id)
+                results_writer.add(
+                    song_id, seg_results,
+                    meta={k: v for k, v in song_result.items() if k not in ("segments", "arc")},
+                )
 
-        # Module 3: narrative summary
-        summary = summarize_song(song_id, seg_results, song_importance)
-        safe_id = song_id.replace(" ", "_")
-        summary_path = os.path.join(OUTPUT_SUMMARIES, f"{safe_id}_summary.txt")
-        with open(summary_path, "w", encoding="utf-8") as f:
-            f.write(summary)
-        print("  Summary written to:", summary_path)
+        if render:
+            # Module 2: word-level importance, timeline + word clouds (in the pool)
+            with metrics.stage("render_wait"):
+                render_pool.submit(
+                    song_id, song_result,
+                    context=(song, song_id, seg_results, arc, song_genres, song_counts),
+                )
+            for context, rendered in render_pool.completed():
+                rendered_song(context, rendered)
+        elif summarize:
+            with metrics.stage("word_importance"):
+                importance = aggregate_song_importance_vectorized(seg_results, lexicon)
+            submit_summary(song, song_id, seg_results, arc, importance, song_genres, song_counts, [])
+        else:
+            song_done(song, song_id, song_genres, song_counts, [])
+        if summarize:
+            for context, summarized in summarizer.completed():
+                summarized_song(context, summarized)
+        metrics.tick()
+
+    if render:
+        with metrics.stage("render_wait"):
+            finished = list(render_pool.completed(wait=True))
+        for context, rendered in finished:
+            rendered_song(context, rendered)
+        render_pool.close()
+    if summarize:
+        with metrics.stage("summary_wait"):
+            finished = list(summarizer.completed(wait=True))
+        for context, summarized in finished:
+            summarized_song(context, summarized)
+        summarizer.close()
+
+    if infer:
+        with metrics.stage("results_write"):
+            results_writer.close()
+            arc_writer.close()
+
+        # Reduction stage: persist genre x emotion counts, render the bubble map once
+        genre_stats.save(paths["genre_counts"])
+        if shard is None:
+            print("Building genre-emotion bubble map...")
+            with metrics.stage("bubble_render"):
+                render_genre_bubble(genre_stats)
+            print("Genre-emotion bubble saved.")
+
+        print(interner.stats_line())
+        print(cache.stats_line())
+        token_cache.close()
+        print(token_cache.stats_line())
+        metrics.count("distinct_segments", interner.unique)
+        metrics.count("cache_hits", cache.hits)
+        metrics.count("cache_misses", cache.misses)
+        cache.close()
+    if summarize:
+        print(summary_cache.stats_line())
+        metrics.count("summary_cache_hits", summary_cache.hits)
+        summary_cache.close()
+    manifest.close()
+
+    metrics.print_summary()
+    metrics.close()
+
+    if shard is not None and full_run:
+        mark_done(paths, shard=shard_index, num_shards=shard_count, songs_completed=processed)
+        print(f"Shard {shard_index}/{shard_count} done; merge with: python -m src.sharding merge --num-shards {shard_count}")
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Run the lyrics emotion pipeline.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip songs whose row, model, lexicon and code version are unchanged since the last run",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=RENDER_WORKERS,
+        help="processes for timeline/wordcloud rendering (0 = render inline)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["torch", "int8", "onnx"],
+        default=INFERENCE_BACKEND,
+        help="inference backend (int8/onnx run on CPU)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=INFERENCE_THREADS,
+        help="intra-op CPU threads for inference (0 = library default)",
+    )
+    parser.add_argument(
+        "--events",
+        default=RUN_EVENTS_PATH,
+        help="JSON-lines file for run events (start / progress / end)",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        default=None,
+        help="run this stage under cProfile (e.g. forward, tokenize, load_segment)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="process only shard I of N (0-based); resumable, combine with src.sharding merge",
+    )
+    parser.add_argument(
+        "--token-windows",
+        action="store_true",
+        help="pack lines into token-budget model inputs (no truncation, fewer forward passes)",
+    )
+    parser.add_argument(
+        "--stages",
+        type=parse_stages,
+        default=set(STAGES),
+        help=f"comma list of stages to run ({', '.join(STAGES)}) or 'all'; "
+             "render/summarize without infer read the results store",
+    )
+    args = parser.parse_args()
+    run_pipeline(
+        incremental=args.incremental,
+        render_workers=args.render_workers,
+        backend=args.backend,
+        num_threads=args.threads,
+        events_path=args.events,
+        profile_stage=args.profile_stage,
+        shard=args.shard,
+        token_windows=args.token_windows,
+        stages=args.stages,
+    )
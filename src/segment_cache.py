@@ -0,0 +1,151 @@
+# src/segment_cache.py
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+from .config import SEGMENT_CACHE_DIR, SEGMENTATION_VERSION
+
+_SONG_KEYS = (
+    "artist_name", "song_name", "genres", "language",
+    "artist_popularity", "new_artist_popularity",
+)
+
+def source_stat(csv_path: str) -> dict:
+    """
+    Identity of a CSV for cache keys: resolved path, size and mtime. Cheap
+    (no read of the file), and any edit or replacement of the dump changes it.
+    """
+    st = os.stat(csv_path)
+    return {"csv": os.path.realpath(csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def prune(root: str = SEGMENT_CACHE_DIR) -> int:
+    """
+    Remove entries whose CSV no longer exists or has changed since the entry
+    was built, plus leftover temporary directories of dead runs.
+    Returns the number of directories removed.
+    """
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if ".tmp-" in name:
+            pid = int(name.rsplit("-", 1)[1]) if name.rsplit("-", 1)[1].isdigit() else None
+            if pid is not None and _pid_alive(pid):
+                continue
+        else:
+            try:
+                with open(os.path.join(path, "complete.json"), encoding="utf-8") as f:
+                    source = json.load(f)["source"]
+                if source_stat(source["csv"]) == source:
+                    continue
+            except (OSError, ValueError, KeyError):
+                # incomplete/unreadable entry, or its CSV is gone
+                pass
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _joiner(mode: str) -> str:
+    # segments never contain their own separator (they are stripped pieces of
+    # text split on it), so joining with it round-trips exactly
+    return "\n\n" if mode == "stanza" else "\n"
+
+class SegmentCache:
+    """
+    Segmented songs of one CSV, stored chunk by chunk on disk so later runs
+    skip CSV parsing, mojibake repair and segmentation:
+
+      <root>/<key>/chunk-00000.pkl   columns of one chunk, segments joined per song
+      <root>/<key>/complete.json     chunk and song counts
+
+    An entry is built in a private temporary directory and renamed into place
+    once the whole CSV was read, so concurrent runs (shards) sharing the cache
+    never see a partial entry. The key covers the CSV contents, chunk size,
+    segment mode and SEGMENTATION_VERSION; any change starts a fresh entry.
+    The CSV is identified by path, size and mtime (source_stat), so opening
+    the cache never reads the file. Publishing an entry prunes the ones
+    left behind by earlier versions of the CSV.
+    """
+
+    def __init__(self, csv_path: str, segment_mode: str, chunksize: int, root: str = SEGMENT_CACHE_DIR):
+        self.segment_mode = segment_mode
+        self.root = root
+        self.source = source_stat(csv_path)
+        raw = json.dumps([self.source, segment_mode, chunksize, SEGMENTATION_VERSION])
+        self.dir = os.path.join(root, hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16])
+        self.marker = os.path.join(self.dir, "complete.json")
+
+    def is_complete(self) -> bool:
+        return os.path.exists(self.marker)
+
+    @staticmethod
+    def _chunk_path(entry_dir: str, i: int) -> str:
+        return os.path.join(entry_dir, f"chunk-{i:05d}.pkl")
+
+    def read(self):
+        """
+        Yield cached chunks as lists of song dicts (requires is_complete()).
+        """
+        with open(self.marker, encoding="utf-8") as f:
+            n_chunks = json.load(f)["chunks"]
+        sep = _joiner(self.segment_mode)
+        for i in range(n_chunks):
+            with open(self._chunk_path(self.dir, i), "rb") as f:
+                cols = pickle.load(f)
+            rows = zip(*(cols[k] for k in _SONG_KEYS))
+            yield [
+                {**dict(zip(_SONG_KEYS, row)), "segments": text.split(sep) if text else []}
+                for row, text in zip(rows, cols["segments"])
+            ]
+
+    def write_through(self, chunks):
+        """
+        Pass chunks through while storing them; the entry is only published
+        if the whole CSV was consumed.
+        """
+        tmp_dir = f"{self.dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        sep = _joiner(self.segment_mode)
+        n_chunks = n_songs = 0
+        for songs in chunks:
+            cols = {k: [s[k] for s in songs] for k in _SONG_KEYS}
+            cols["segments"] = [sep.join(s["segments"]) for s in songs]
+            with open(self._chunk_path(tmp_dir, n_chunks), "wb") as f:
+                pickle.dump(cols, f, protocol=pickle.HIGHEST_PROTOCOL)
+            n_chunks += 1
+            n_songs += len(songs)
+            yield songs
+        with open(os.path.join(tmp_dir, "complete.json"), "w", encoding="utf-8") as f:
+            json.dump({"chunks": n_chunks, "songs": n_songs, "source": self.source}, f)
+        try:
+            os.rename(tmp_dir, self.dir)
+        except OSError:
+            # another run published the same entry first (and may be reading it)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        prune(self.root)
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment cache maintenance.")
+    parser.add_argument("command", choices=["prune"], help="remove entries of changed or deleted CSVs")
+    parser.add_argument("--root", default=SEGMENT_CACHE_DIR)
+    args = parser.parse_args()
+    print(f"Removed {prune(args.root)} stale entries from {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# src/segment_dedup.py
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import SEGMENT_DEDUP_MAX_ENTRIES
+from .prediction_cache import normalize_segment
+
+class SegmentInterner:
+    """
+    In-memory id table of normalized segment text for one run, so each
+    distinct line (choruses, repeated hooks, lines shared between songs) is
+    scored by the model once and the result is scattered to every occurrence.
+
+    intern() gives each distinct text a stable id; resolve() stores an id's
+    logits/probs once known. Resolved entries are kept in LRU order and
+    dropped past `max_entries` (the PredictionCache covers longer-range reuse).
+
+    `unit` names what is interned, for the stats: "segments" (one input per
+    line) or "token windows" (packed inputs, see batch_scheduler). The caller
+    counts the source lines behind them in `lines`.
+    """
+
+    def __init__(self, max_entries: int = SEGMENT_DEDUP_MAX_ENTRIES, unit: str = "segments"):
+        self.max_entries = max_entries
+        self.unit = unit
+        self.ids = {}                 # normalized text -> id
+        self.keys = {}                # id -> normalized text
+        self.results = OrderedDict()  # id -> (logits, probs), LRU order
+        self.next_id = 0
+        self.occurrences = 0
+        self.unique = 0
+        self.lines = 0
+
+    def intern(self, text: str):
+        """
+        Returns (id, result) where result is the stored (logits, probs) or None.
+        """
+        self.occurrences += 1
+        key = normalize_segment(text)
+        sid = self.ids.get(key)
+        if sid is None:
+            sid = self.ids[key] = self.next_id
+            self.keys[sid] = key
+            self.next_id += 1
+            self.unique += 1
+            return sid, None
+        result = self.results.get(sid)
+        if result is not None:
+            self.results.move_to_end(sid)
+        return sid, result
+
+    def resolve(self, sid: int, logits, probs):
+        result = (np.array(logits, dtype=np.float32), np.array(probs, dtype=np.float32))
+        self.results[sid] = result
+        while len(self.results) > self.max_entries:
+            evicted, _ = self.results.popitem(last=False)
+            # forget the text too: if it comes back it gets a fresh id
+            del self.ids[self.keys.pop(evicted)]
+        return result
+
+    @property
+    def dedup_ratio(self) -> float:
+        """
+        Fraction of interned inputs that did not need their own prediction.
+        """
+        return 1.0 - self.unique / self.occurrences if self.occurrences else 0.0
+
+    def stats_line(self) -> str:
+        if self.unit == "segments":
+            return (
+                f"Segment dedup: {self.occurrences} segments, {self.unique} distinct "
+                f"({self.dedup_ratio:.1%} deduplicated)"
+            )
+        return (
+            f"Input dedup: {self.occurrences} {self.unit} from {self.lines} lines, "
+            f"{self.unique} distinct {self.unit} ({self.dedup_ratio:.1%} deduplicated)"
+        )
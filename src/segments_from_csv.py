@@ -1,7 +1,17 @@
-from typing import List, Dict
+import queue
+import threading
+from typing import List, Dict, Iterator
 import pandas as pd
-from .load_songs_from_csv import load_song_df
-from .encoding_utils import fix_mojibake
+from .config import CSV_CHUNKSIZE
+from .load_songs_from_csv import iter_song_chunks
+from .segment_cache import SegmentCache
+from .encoding_utils import fix_mojibake, fix_mojibake_column
+
+def _split_segments(text: str, mode: str) -> List[str]:
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    sep = "\n\n" if mode == "stanza" else "\n"
+    return [seg for seg in map(str.strip, text.split(sep)) if seg]
 
 def segment_lyrics(lyrics: str, mode: str = "line") -> List[str]:
     """
@@ -11,17 +21,101 @@ def segment_lyrics(lyrics: str, mode: str = "line") -> List[str]:
     """
     if not isinstance(lyrics, str):
         return []
+    return _split_segments(fix_mojibake(lyrics), mode)
 
-    lyrics = fix_mojibake(lyrics)
+def segment_column(lyrics, mode: str = "line") -> List[List[str]]:
+    """
+    segment_lyrics over a whole lyrics column (Series or list): mojibake is
+    repaired only on rows that can need it, then each row is split once.
+    """
+    return [
+        _split_segments(text, mode) if isinstance(text, str) else []
+        for text in fix_mojibake_column(lyrics)
+    ]
 
-    text = lyrics.replace("\r\n", "\n").replace("\r", "\n")
+def songs_from_chunk(df: pd.DataFrame, segment_mode: str = "line") -> List[Dict]:
+    """
+    Build segmented song dicts for one chunk of the songs CSV.
+    Optional columns that are missing from the CSV default like row.get() would.
+    """
+    n = len(df)
 
-    if mode == "stanza":
-        blocks = [b.strip() for b in text.split("\n\n") if b.strip()]
-        return blocks
+    def column(name, default):
+        return df[name].tolist() if name in df.columns else [default] * n
+
+    artists = df["artist_name"].tolist()
+    names = df["song_name"].tolist()
+    genres = fix_mojibake_column(column("genres", ""))
+    languages = column("language", None)
+    popularity = column("artist_popularity", None)
+    new_popularity = column("new_artist_popularity", None)
+    segments = segment_column(df["lyrics"], mode=segment_mode)
+
+    return [
+        {
+            "artist_name": artists[i],
+            "song_name": names[i],
+            "genres": genres[i],
+            "language": languages[i],
+            "artist_popularity": popularity[i],
+            "new_artist_popularity": new_popularity[i],
+            "segments": segments[i]
+        }
+        for i in range(n)
+    ]
+
+def _prefetch(iterable, depth: int):
+    """
+    Run `iterable` in a background thread (started right away), keeping up to
+    `depth` items ready. Exceptions in the producer are re-raised in the consumer.
+    """
+    q = queue.Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                q.put(item)
+        except BaseException as exc:  # hand the failure to the consumer
+            q.put(exc)
+        q.put(done)
+
+    def consume():
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    threading.Thread(target=produce, daemon=True).start()
+    return consume()
+
+def iter_songs_and_segments_csv(
+    path: str,
+    segment_mode: str = "line",
+    chunksize: int = CSV_CHUNKSIZE,
+    prefetch_chunks: int = 0,
+    cache_dir: str = None,
+) -> Iterator[Dict]:
+    """
+    Lazily yield segmented songs (same dicts as load_songs_and_segments_csv),
+    reading the CSV `chunksize` rows at a time. With prefetch_chunks > 0 the
+    next chunks are parsed and segmented in a background thread, starting
+    immediately, while the caller works on the current one.
+    With cache_dir set, segmented chunks are read from / stored in a SegmentCache.
+    """
+    cache = SegmentCache(path, segment_mode, chunksize, root=cache_dir) if cache_dir else None
+    if cache is not None and cache.is_complete():
+        chunks = cache.read()
     else:
-        lines = [l.strip() for l in text.split("\n") if l.strip()]
-        return lines
+        chunks = (songs_from_chunk(df, segment_mode) for df in iter_song_chunks(path, chunksize))
+        if cache is not None:
+            chunks = cache.write_through(chunks)
+    if prefetch_chunks > 0:
+        chunks = _prefetch(chunks, prefetch_chunks)
+    return (song for songs in chunks for song in songs)
 
 def load_songs_and_segments_csv(path: str, segment_mode: str = "line") -> List[Dict]:
     """
@@ -36,21 +130,7 @@ def load_songs_and_segments_csv(path: str, segment_mode: str = "line") -> List[D
       "segments": ["line 1", "line 2", ...]
     }
     """
-    df: pd.DataFrame = load_song_df(path)
-
-    songs = []
-    for _, row in df.iterrows():
-        segments = segment_lyrics(row["lyrics"], mode=segment_mode)
-        songs.append({
-            "artist_name": row["artist_name"],
-            "song_name": row["song_name"],
-            "genres": fix_mojibake(row.get("genres", "")),
-            "language": row.get("language", None),
-            "artist_popularity": row.get("artist_popularity", None),
-            "new_artist_popularity": row.get("new_artist_popularity", None),
-            "segments": segments
-        })
-    return songs
+    return list(iter_songs_and_segments_csv(path, segment_mode=segment_mode))
 
 if __name__ == "__main__":
     songs = load_songs_and_segments_csv("data/songs.csv", segment_mode="line")
@@ -0,0 +1,183 @@
+# src/sharding.py
+"""
+Split a catalog run across processes / machines sharing one output directory.
+
+Each song belongs to exactly one shard (stable hash of artist + song name):
+
+    python -m src.run_pipeline --shard 0/4      # one per process / node
+    python -m src.run_pipeline --shard 1/4
+    ...
+    python -m src.sharding status --num-shards 4
+    python -m src.sharding merge --num-shards 4
+
+A shard keeps its manifest, results store, caches, counts and events under
+SHARDS_DIR/shard-<i>-of-<n>/; rerunning a shard resumes from its manifest.
+Merging combines the genre x emotion counts, result stores, arc indexes and manifests
+into the global outputs and renders the bubble map.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from .config import (
+    SHARDS_DIR,
+    RESULTS_DIR,
+    ARC_INDEX_DIR,
+    MANIFEST_PATH,
+    GENRE_COUNTS_PATH,
+    OUTPUT_TIMELINES,
+)
+from .genre_stats import GenreEmotionCounts
+from .manifest import Manifest
+from .results_store import ResultsStore, ResultsWriter
+from .arc_index import ArcIndex, ArcWriter
+
+def parse_shard(spec: str):
+    """
+    "i/N" -> (i, N), with 0 <= i < N.
+    """
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in [0, {count}), got {spec!r}")
+    return index, count
+
+def shard_of(artist_name, song_name, num_shards: int) -> int:
+    """
+    Stable shard of a song: the same on every machine, run and Python version.
+    """
+    raw = f"{artist_name}\0{song_name}".encode("utf-8")
+    return int.from_bytes(hashlib.sha1(raw).digest()[:8], "big") % num_shards
+
+def shard_paths(index: int, count: int, root: str = SHARDS_DIR) -> dict:
+    """
+    Per-shard locations of everything a run writes besides the per-song files.
+    """
+    shard_dir = os.path.join(root, f"shard-{index:03d}-of-{count:03d}")
+    return {
+        "dir": shard_dir,
+        "manifest": os.path.join(shard_dir, "manifest.jsonl"),
+        "results": os.path.join(shard_dir, "results"),
+        "arc_index": os.path.join(shard_dir, "arc_index"),
+        "genre_counts": os.path.join(shard_dir, "genre_emotion_counts.csv"),
+        "events": os.path.join(shard_dir, "run_events.jsonl"),
+        "prediction_cache": os.path.join(shard_dir, "predictions.sqlite"),
+        "summary_cache": os.path.join(shard_dir, "summaries.sqlite"),
+        "done": os.path.join(shard_dir, "done.json"),
+    }
+
+def mark_done(paths: dict, **info):
+    """
+    Written last by a finished shard; merge refuses shards without it.
+    """
+    tmp = paths["done"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"finished": time.time(), **info}, f)
+    os.replace(tmp, paths["done"])
+
+def shard_status(count: int, root: str = SHARDS_DIR):
+    """
+    One dict per shard: songs recorded in its manifest and whether it finished.
+    """
+    rows = []
+    for index in range(count):
+        paths = shard_paths(index, count, root)
+        songs = 0
+        if os.path.exists(paths["manifest"]):
+            manifest = Manifest(paths["manifest"], fingerprint=None, readonly=True)
+            songs = len(manifest.entries)
+        done = None
+        if os.path.exists(paths["done"]):
+            with open(paths["done"], encoding="utf-8") as f:
+                done = json.load(f)
+        rows.append({"shard": index, "dir": paths["dir"], "songs": songs, "done": done})
+    return rows
+
+def merge_shards(
+    count: int,
+    root: str = SHARDS_DIR,
+    results_dir: str = RESULTS_DIR,
+    arc_index_dir: str = ARC_INDEX_DIR,
+    manifest_path: str = MANIFEST_PATH,
+    genre_counts_path: str = GENRE_COUNTS_PATH,
+    allow_partial: bool = False,
+    render: bool = True,
+) -> GenreEmotionCounts:
+    """
+    Reduce finished shards into the global genre x emotion counts, results
+    store, arc index and manifest, then render the genre bubble map.
+    """
+    status = shard_status(count, root)
+    missing = [row["shard"] for row in status if row["done"] is None]
+    if missing and not allow_partial:
+        raise RuntimeError(
+            f"shards {missing} of {count} have not finished (rerun them, or pass --allow-partial)"
+        )
+
+    genre_stats = GenreEmotionCounts()
+    writer = ResultsWriter(results_dir)
+    arc_writer = ArcWriter(arc_index_dir)
+    manifest = Manifest(manifest_path, fingerprint=None)
+    merged_songs = 0
+    for row in status:
+        if row["shard"] in missing:
+            continue
+        paths = shard_paths(row["shard"], count, root)
+        genre_stats.merge(GenreEmotionCounts.load(paths["genre_counts"]))
+        for song_id, meta, results in ResultsStore(paths["results"]):
+            writer.add(song_id, results, meta={k: v for k, v in meta.items() if k != "song_id"})
+            merged_songs += 1
+        arcs = ArcIndex(paths["arc_index"])
+        for song_id, vec_row in arcs.index.items():
+            arc_writer.add_vector(song_id, arcs.vectors[vec_row])
+        shard_manifest = Manifest(paths["manifest"], fingerprint=None, readonly=True)
+        for entry in shard_manifest.entries.values():
+            manifest.record_entry(entry)
+    writer.close()
+    arc_writer.close()
+    manifest.close()
+
+    genre_stats.save(genre_counts_path)
+    print(f"Merged {merged_songs} songs from {count - len(missing)}/{count} shards")
+    if render:
+        # imported here so status/merge without rendering stay lightweight
+        from .visualization import plot_genre_emotion_bubble
+
+        genre_emotion_counts, genre_total_segments = genre_stats.to_dicts()
+        Path(OUTPUT_TIMELINES).mkdir(parents=True, exist_ok=True)
+        plot_genre_emotion_bubble(genre_emotion_counts, genre_total_segments, OUTPUT_TIMELINES, top_n=25)
+        print("Genre-emotion bubble saved.")
+    return genre_stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=SHARDS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_status = sub.add_parser("status", help="progress of each shard")
+    p_status.add_argument("--num-shards", type=int, required=True)
+    p_merge = sub.add_parser("merge", help="combine finished shards into the global outputs")
+    p_merge.add_argument("--num-shards", type=int, required=True)
+    p_merge.add_argument("--allow-partial", action="store_true", help="skip shards that have not finished")
+    p_merge.add_argument("--no-render", action="store_true", help="do not render the bubble map")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for row in shard_status(args.num_shards, args.root):
+            state = "done" if row["done"] else "running/incomplete"
+            print(f"shard {row['shard']:>3}/{args.num_shards}  {row['songs']:>8} songs  {state}  {row['dir']}")
+    elif args.command == "merge":
+        merge_shards(
+            args.num_shards,
+            root=args.root,
+            allow_partial=args.allow_partial,
+            render=not args.no_render,
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# src/summary_cache.py
+"""
+Persistent cache of narrative summaries, keyed by a hash of the exact
+chat request (model, system prompt, user prompt, temperature, max_tokens).
+
+    python -m src.summary_cache stats
+    python -m src.summary_cache list --limit 20
+    python -m src.summary_cache prune --older-than-days 30 --max-entries 50000
+    python -m src.summary_cache clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .config import SUMMARY_CACHE_PATH, SUMMARY_CACHE_TTL_DAYS, SUMMARY_CACHE_MAX_ENTRIES
+
+def request_key(request: dict) -> str:
+    """
+    Hash of everything in a chat request that can change the answer.
+    """
+    messages = {m["role"]: m["content"] for m in request["messages"]}
+    payload = [
+        request["model"],
+        messages.get("system", ""),
+        messages.get("user", ""),
+        request.get("temperature"),
+        request.get("max_tokens"),
+    ]
+    raw = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SummaryCache:
+    """
+    SQLite store of summaries. Entries older than `ttl_days` are treated as
+    missing and removed by prune(); past `max_entries` the least recently
+    used ones go first. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = SUMMARY_CACHE_PATH,
+        ttl_days: float = SUMMARY_CACHE_TTL_DAYS,
+        max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+    ):
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl_days = ttl_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " song_id TEXT,"
+            " summary TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries(last_used)"
+        )
+        self.conn.commit()
+
+    def _expiry_cutoff(self):
+        return time.time() - self.ttl_days * 86400 if self.ttl_days else 0.0
+
+    def get(self, request: dict):
+        key = request_key(request)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created_at >= ?",
+                (key, self._expiry_cutoff()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE summaries SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, request: dict, summary: str, song_id: str = None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries"
+                " (key, model, song_id, summary, created_at, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (request_key(request), request["model"], song_id, summary, now, now),
+            )
+            self.conn.commit()
+
+    def prune(self, older_than_days: float = None, max_entries: int = None) -> int:
+        """
+        Delete expired entries (created more than `older_than_days` ago, default
+        the TTL) and then least recently used ones beyond `max_entries`.
+        Returns the number of rows removed.
+        """
+        older_than_days = self.ttl_days if older_than_days is None else older_than_days
+        max_entries = self.max_entries if max_entries is None else max_entries
+        removed = 0
+        with self.lock:
+            if older_than_days:
+                cutoff = time.time() - older_than_days * 86400
+                removed += self.conn.execute(
+                    "DELETE FROM summaries WHERE created_at < ?", (cutoff,)
+                ).rowcount
+            count = self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            if max_entries is not None and count > max_entries:
+                removed += self.conn.execute(
+                    "DELETE FROM summaries WHERE key IN ("
+                    " SELECT key FROM summaries ORDER BY last_used ASC LIMIT ?)",
+                    (count - max_entries,),
+                ).rowcount
+            self.conn.commit()
+        return removed
+
+    def clear(self) -> int:
+        with self.lock:
+            removed = self.conn.execute("DELETE FROM summaries").rowcount
+            self.conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            count, total_hits, oldest, newest = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), MIN(created_at), MAX(created_at) FROM summaries"
+            ).fetchone()
+            expired = self.conn.execute(
+                "SELECT COUNT(*) FROM summaries WHERE created_at < ?", (self._expiry_cutoff(),)
+            ).fetchone()[0]
+        return {
+            "entries": count,
+            "expired": expired,
+            "lifetime_hits": total_hits,
+            "oldest": oldest,
+            "newest": newest,
+        }
+
+    def entries(self, limit: int = 20):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT key, model, song_id, created_at, last_used, hits, summary"
+                " FROM summaries ORDER BY last_used DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Summary cache: {self.hits} hits, {self.misses} misses ({rate:.1%} hit rate)"
+
+    def close(self):
+        self.prune()
+        with self.lock:
+            self.conn.close()
+
+def _fmt_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=SUMMARY_CACHE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="entry counts and age range")
+    p_list = sub.add_parser("list", help="most recently used entries")
+    p_list.add_argument("--limit", type=int, default=20)
+    p_prune = sub.add_parser("prune", help="drop expired / least recently used entries")
+    p_prune.add_argument("--older-than-days", type=float, default=None)
+    p_prune.add_argument("--max-entries", type=int, default=None)
+    sub.add_parser("clear", help="delete every entry")
+    args = parser.parse_args()
+
+    cache = SummaryCache(args.path)
+    if args.command == "stats":
+        s = cache.stats()
+        print(f"entries:        {s['entries']}")
+        print(f"expired:        {s['expired']}")
+        print(f"lifetime hits:  {s['lifetime_hits']}")
+        print(f"oldest / newest: {_fmt_time(s['oldest'])} / {_fmt_time(s['newest'])}")
+    elif args.command == "list":
+        for key, model, song_id, created, used, hits, summary in cache.entries(args.limit):
+            preview = " ".join(summary.split())[:60]
+            print(f"{key[:12]}  {model}  created {_fmt_time(created)}  used {_fmt_time(used)}  hits {hits}  {song_id}")
+            print(f"    {preview}...")
+    elif args.command == "prune":
+        print(f"Removed {cache.prune(args.older_than_days, args.max_entries)} entries")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} entries")
+    cache.conn.close()
+
+if __name__ == "__main__":
+    main()
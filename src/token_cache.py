@@ -0,0 +1,257 @@
+# src/token_cache.py
+"""
+Pre-tokenized segment store shared by inference and the training dataset.
+
+Token ids of every distinct text are kept in a ragged int32 buffer, so a
+text is tokenized once (in large batches with the fast tokenizer) and later
+read back as a memory-mapped slice. One directory per tokenizer setting:
+
+  <root>/<key>/part-<id>/ids.npy       int32, all token ids back to back
+  <root>/<key>/part-<id>/offsets.npy   int64 (entries + 1,) row i = ids[offsets[i]:offsets[i + 1]]
+  <root>/<key>/part-<id>/hashes.npy    uint64 (entries,) text hash of each row
+
+The key covers the tokenizer name, truncation length, whether special tokens
+are added and TOKENIZATION_VERSION. Parts are written under a temporary name
+and renamed into place, so concurrent runs (shards) can share a directory.
+Padding is left to batch time (pad_batch).
+
+    python -m src.token_cache build          # pre-tokenize every CSV segment
+    python -m src.token_cache stats
+"""
+
+import argparse
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+from .config import MAX_LENGTH, TOKEN_CACHE_DIR, TOKEN_CACHE_PART_ENTRIES, TOKENIZATION_VERSION
+
+def text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def tokenizer_name(tokenizer) -> str:
+    return getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+
+def pad_batch(input_ids, pad_id: int, left: bool = False):
+    """
+    Pad token id sequences to the longest one.
+    Returns (ids, attention_mask) as int64 arrays of shape (batch, longest).
+    """
+    lengths = np.fromiter((len(seq) for seq in input_ids), dtype=np.int64, count=len(input_ids))
+    width = int(lengths.max()) if len(lengths) else 0
+    ids = np.full((len(input_ids), width), pad_id, dtype=np.int64)
+    mask = np.zeros((len(input_ids), width), dtype=np.int64)
+    for row, (seq, n) in enumerate(zip(input_ids, lengths)):
+        if left:
+            ids[row, width - n:] = seq
+            mask[row, width - n:] = 1
+        else:
+            ids[row, :n] = seq
+            mask[row, :n] = 1
+    return ids, mask
+
+class TokenCache:
+    """
+    encode(texts) returns token ids for a list of texts: cached rows are read
+    from the memory-mapped parts, the rest are tokenized in one call and
+    appended. New rows are written as a part every `part_entries` rows and
+    on flush()/close().
+
+    max_length=None with add_special_tokens=False gives untruncated line ids,
+    as used for token-budget windows.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        root: str = TOKEN_CACHE_DIR,
+        max_length: int = MAX_LENGTH,
+        add_special_tokens: bool = True,
+        part_entries: int = TOKEN_CACHE_PART_ENTRIES,
+    ):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.add_special_tokens = add_special_tokens
+        self.part_entries = part_entries
+        raw = f"{tokenizer_name(tokenizer)}\0{max_length}\0{add_special_tokens}\0{TOKENIZATION_VERSION}"
+        self.dir = os.path.join(root, hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16])
+        os.makedirs(self.dir, exist_ok=True)
+        self.parts = []
+        self.part_names = set()
+        self._hashes = np.zeros(0, dtype=np.uint64)  # sorted
+        self._part_of = np.zeros(0, dtype=np.int32)  # part of each sorted hash
+        self._rows = np.zeros(0, dtype=np.int64)     # row in that part
+        self.hits = self.misses = 0
+        self._new = {}  # text hash -> int32 ids not yet written to a part
+        self._refresh()
+
+    def _refresh(self):
+        """
+        Merge parts not indexed yet (new ones of this run, or written by other
+        runs) into the sorted hash index; already indexed parts are not reread.
+        """
+        hashes, part_of, rows = [], [], []
+        for name in sorted(os.listdir(self.dir)):
+            if not name.startswith("part-") or ".tmp" in name or name in self.part_names:
+                continue
+            path = os.path.join(self.dir, name)
+            h = np.load(os.path.join(path, "hashes.npy"))
+            hashes.append(h)
+            part_of.append(np.full(len(h), len(self.parts), dtype=np.int32))
+            rows.append(np.arange(len(h), dtype=np.int64))
+            self.parts.append({
+                "ids": np.load(os.path.join(path, "ids.npy"), mmap_mode="r"),
+                "offsets": np.load(os.path.join(path, "offsets.npy")),
+            })
+            self.part_names.add(name)
+        if not hashes:
+            return
+        hashes = np.concatenate(hashes)
+        order = np.argsort(hashes, kind="stable")
+        hashes = hashes[order]
+        # one linear merge of the new sorted block into the index
+        at = np.searchsorted(self._hashes, hashes, side="right")
+        self._hashes = np.insert(self._hashes, at, hashes)
+        self._part_of = np.insert(self._part_of, at, np.concatenate(part_of)[order])
+        self._rows = np.insert(self._rows, at, np.concatenate(rows)[order])
+
+    def __len__(self):
+        return len(self._hashes) + len(self._new)
+
+    def _tokenize(self, texts):
+        if self.max_length is None:
+            enc = self.tokenizer(list(texts), add_special_tokens=self.add_special_tokens, truncation=False)
+        else:
+            enc = self.tokenizer(
+                list(texts), add_special_tokens=self.add_special_tokens,
+                truncation=True, max_length=self.max_length,
+            )
+        return [np.asarray(ids, dtype=np.int32) for ids in enc["input_ids"]]
+
+    def lookup(self, hashes: np.ndarray):
+        """
+        Index of each hash in the sorted table and whether it was found.
+        """
+        idx = np.searchsorted(self._hashes, hashes)
+        found = idx < len(self._hashes)
+        found[found] = self._hashes[idx[found]] == hashes[found]
+        return idx, found
+
+    def encode(self, texts):
+        """
+        int32 token id arrays, one per text, in order.
+        """
+        texts = list(texts)
+        hashes = np.fromiter((text_hash(t) for t in texts), dtype=np.uint64, count=len(texts))
+        idx, found = self.lookup(hashes)
+        out = [None] * len(texts)
+        for i in np.flatnonzero(found):
+            part = self.parts[self._part_of[idx[i]]]
+            row = self._rows[idx[i]]
+            out[i] = np.array(part["ids"][part["offsets"][row]:part["offsets"][row + 1]])
+        todo = {}  # text hash -> first position of a text not in any part
+        for i in np.flatnonzero(~found):
+            h = int(hashes[i])
+            ids = self._new.get(h)
+            if ids is not None:
+                out[i] = ids
+            else:
+                todo.setdefault(h, []).append(i)
+        self.hits += len(texts) - sum(len(v) for v in todo.values())
+        if todo:
+            self.misses += len(todo)
+            encoded = self._tokenize([texts[pos[0]] for pos in todo.values()])
+            for (h, positions), ids in zip(todo.items(), encoded):
+                self._new[h] = ids
+                for i in positions:
+                    out[i] = ids
+            if len(self._new) >= self.part_entries:
+                self.flush()
+        return out
+
+    def encode_ragged(self, texts):
+        """
+        encode() as one ragged buffer: (int32 ids, int64 offsets).
+        """
+        seqs = self.encode(texts)
+        offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in seqs], out=offsets[1:])
+        ids = np.concatenate(seqs) if seqs else np.zeros(0, dtype=np.int32)
+        return ids.astype(np.int32, copy=False), offsets
+
+    def flush(self):
+        if not self._new:
+            return
+        hashes = np.fromiter(self._new.keys(), dtype=np.uint64, count=len(self._new))
+        seqs = list(self._new.values())
+        offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in seqs], out=offsets[1:])
+        name = f"part-{uuid.uuid4().hex[:12]}"
+        tmp = os.path.join(self.dir, f"{name}.tmp")
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "ids.npy"), np.concatenate(seqs).astype(np.int32))
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "hashes.npy"), hashes)
+        os.rename(tmp, os.path.join(self.dir, name))
+        self._new = {}
+        # index this part and any written meanwhile by other runs
+        self._refresh()
+
+    def close(self):
+        self.flush()
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Token cache: {self.hits} hits, {self.misses} tokenized ({rate:.1%} hit rate), {len(self)} entries"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=TOKEN_CACHE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="tokenize every segment of the lyrics CSV")
+    p_build.add_argument("--csv", default=None)
+    p_build.add_argument("--lines", action="store_true", help="untruncated line ids without special tokens (--token-windows)")
+    p_build.add_argument("--segment-mode", choices=["line", "stanza"], default="line")
+    p_build.add_argument("--batch", type=int, default=10_000, help="segments per tokenizer call")
+    sub.add_parser("stats", help="entries and size per tokenizer setting")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        if not os.path.isdir(args.root):
+            print("empty")
+            return
+        for key in sorted(os.listdir(args.root)):
+            path = os.path.join(args.root, key)
+            parts = [p for p in os.listdir(path) if p.startswith("part-") and ".tmp" not in p]
+            entries = sum(len(np.load(os.path.join(path, p, "hashes.npy"), mmap_mode="r")) for p in parts)
+            size = sum(
+                os.path.getsize(os.path.join(path, p, f)) for p in parts for f in os.listdir(os.path.join(path, p))
+            )
+            print(f"  {key}  {len(parts):4d} parts  {entries:10d} entries  {size / 1e6:8.1f} MB")
+        return
+
+    from .config import CSV_PATH, SEGMENT_CACHE_DIR
+    from .run_inference import load_tokenizer
+    from .segments_from_csv import iter_songs_and_segments_csv
+
+    cache = TokenCache(
+        load_tokenizer(), root=args.root,
+        max_length=None if args.lines else MAX_LENGTH, add_special_tokens=not args.lines,
+    )
+    batch = []
+    songs = iter_songs_and_segments_csv(args.csv or CSV_PATH, segment_mode=args.segment_mode, cache_dir=SEGMENT_CACHE_DIR)
+    for song in songs:
+        batch.extend(song["segments"])
+        if len(batch) >= args.batch:
+            cache.encode(batch)
+            batch = []
+    if batch:
+        cache.encode(batch)
+    cache.close()
+    print(cache.stats_line())
+
+if __name__ == "__main__":
+    main()
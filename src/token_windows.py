@@ -0,0 +1,90 @@
+# src/token_windows.py
+"""
+Token-budget windows over a song's lines.
+
+Short consecutive lines are packed into one model input up to the token
+budget; a line longer than the budget is split into overlapping pieces.
+Each window records which token span of which line it covers, so window
+predictions can be mapped back onto lines as token-weighted averages
+(a line covered by several windows gets the mean of their predictions).
+"""
+
+from .config import TOKEN_WINDOW_OVERLAP
+
+def plan_windows(line_lengths, budget: int, overlap: int = TOKEN_WINDOW_OVERLAP):
+    """
+    line_lengths: tokens per line (without special tokens).
+    budget: max content tokens per window.
+    overlap: tokens shared between neighbouring windows; for packed lines,
+      trailing whole lines of up to `overlap` tokens are repeated at the start
+      of the next window, and oversized lines are split with this stride overlap.
+
+    Returns a list of windows, each a list of (line, start, end) token spans.
+    Every line is covered by at least one window.
+    """
+    if budget < 1:
+        raise ValueError(f"token budget must be positive, got {budget}")
+    overlap = max(0, min(overlap, budget - 1))
+    windows = []
+    current, used = [], 0
+
+    def flush(carry: bool):
+        nonlocal current, used
+        if current:
+            windows.append(current)
+        kept = []
+        if carry and len(current) > 1:
+            # repeat the tail of this window (whole lines, never all of it)
+            total = 0
+            for span in reversed(current[1:]):
+                size = span[2] - span[1]
+                if total + size > overlap:
+                    break
+                kept.insert(0, span)
+                total += size
+        current, used = kept, sum(e - s for _, s, e in kept)
+
+    for line, n in enumerate(line_lengths):
+        if n > budget:
+            flush(carry=False)
+            stride = budget - overlap
+            start = 0
+            while True:
+                end = min(start + budget, n)
+                windows.append([(line, start, end)])
+                if end == n:
+                    break
+                start += stride
+            continue
+        if used + n > budget:
+            flush(carry=True)
+            # drop carried lines until the new one fits
+            while current and used + n > budget:
+                _, s, e = current.pop(0)
+                used -= e - s
+        current.append((line, 0, n))
+        used += n
+    flush(carry=False)
+    return windows
+
+def special_tokens(tokenizer):
+    """
+    (prefix, suffix) ids the tokenizer wraps every input in, e.g. ([CLS], [SEP]),
+    found by encoding a probe text with and without special tokens.
+    """
+    probe = "a"
+    plain = tokenizer(probe, add_special_tokens=False)["input_ids"]
+    full = tokenizer(probe)["input_ids"]
+    for start in range(len(full) - len(plain) + 1):
+        if full[start:start + len(plain)] == plain:
+            return full[:start], full[start + len(plain):]
+    raise ValueError("could not locate the special tokens this tokenizer adds")
+
+def window_inputs(line_ids, windows, prefix, suffix):
+    """
+    Model input ids for each planned window, wrapped in the special tokens.
+    """
+    return [
+        prefix + [tok for line, s, e in spans for tok in line_ids[line][s:e]] + suffix
+        for spans in windows
+    ]
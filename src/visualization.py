@@ -4,6 +4,7 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 
+from .arc_features import ArcFeatures
 from .config import EMOTIONS
 
 # Colors for each emotion (used in both timeline + bubble map)
@@ -23,19 +24,23 @@ def plot_emotion_timeline(song_result, out_dir: str):
       x-axis: segment index
       y-axis: emotion (categorical)
       color: emotion color
+      dashed lines: change points of the smoothed arc
+    Uses song_result["arc"] (the song's ArcFeatures) when present.
     """
     Path(out_dir).mkdir(parents=True, exist_ok=True)
 
-    labels = [seg["label"] for seg in song_result["segments"]]
-    x = list(range(1, len(labels) + 1))
-
-    # Map label to Y index
-    label_to_idx = {e: i for i, e in enumerate(EMOTIONS)}
-    y = [label_to_idx[l] for l in labels]
-    colors = [EMOTION_COLORS.get(l, "black") for l in labels]
+    arc = song_result.get("arc")
+    if arc is None:
+        arc = ArcFeatures.of_song(song_result["segments"])
+    y = arc.labels
+    x = list(range(1, len(y) + 1))
+    colors = [EMOTION_COLORS.get(EMOTIONS[i], "black") for i in y]
 
     plt.figure(figsize=(12, 3))
     plt.scatter(x, y, c=colors)
+    for pos in arc.change_points(0):
+        # between the last segment before the change and the first after it
+        plt.axvline(pos + 0.5, color="gray", linestyle="--", linewidth=0.8)
     plt.yticks(range(len(EMOTIONS)), EMOTIONS)
     plt.xlabel("Segment index")
     plt.title(f"Emotion timeline: {song_result['artist_name']} - {song_result['song_name']}")
@@ -45,6 +50,7 @@ def plot_emotion_timeline(song_result, out_dir: str):
     out_path = os.path.join(out_dir, f"{safe_name}_timeline.png")
     plt.savefig(out_path)
     plt.close()
+    return out_path
 
 def emotion_wordcloud(song_importance, emotion, out_dir: str, song_id: str, max_words=40):
     """
@@ -55,7 +61,7 @@ def emotion_wordcloud(song_importance, emotion, out_dir: str, song_id: str, max_
 
     freq_dict = song_importance.get(emotion, {})
     if not freq_dict:
-        return
+        return None
 
     # limit to top max_words
     sorted_items = sorted(freq_dict.items(), key=lambda x: x[1], reverse=True)[:max_words]
@@ -77,6 +83,7 @@ def emotion_wordcloud(song_importance, emotion, out_dir: str, song_id: str, max_
     out_path = os.path.join(out_dir, f"{safe_id}_{emotion}_wordcloud.png")
     plt.savefig(out_path)
     plt.close()
+    return out_path
 
 def plot_genre_emotion_bubble(genre_emotion_counts, genre_total_segments, out_dir: str, top_n: int = 20):
     """
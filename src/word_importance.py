@@ -121,3 +121,104 @@ def aggregate_song_importance(song_segments, lexicon):
                 song_importance[e][w] += scores[e]
 
     return song_importance
+
+class LexiconMatrix:
+    """
+    Array-backed lexicon: `index` maps word -> row of `matrix`, a float32
+    (vocab + 1, emotions) array whose last row is all zeros for unknown words.
+    """
+
+    def __init__(self, words, matrix):
+        self.index = {w: i for i, w in enumerate(words)}
+        self.matrix = matrix
+        self.oov = len(words)
+
+    def rows(self, tokens):
+        return np.fromiter(
+            (self.index.get(w, self.oov) for w in tokens), dtype=np.int64, count=len(tokens)
+        )
+
+def compile_lexicon(lexicon) -> LexiconMatrix:
+    """
+    Convert the dict lexicon from load_lexicon into a LexiconMatrix.
+    """
+    words = list(lexicon.keys())
+    matrix = np.zeros((len(words) + 1, len(EMOTIONS)), dtype=np.float32)
+    for i, w in enumerate(words):
+        matrix[i] = [lexicon[w][e] for e in EMOTIONS]
+    return LexiconMatrix(words, matrix)
+
+def load_lexicon_matrix(path: str) -> LexiconMatrix:
+    return compile_lexicon(load_lexicon(path))
+
+def word_emotion_matrix(tokens, seg_ids, seg_probs, lex: LexiconMatrix, lam=0.7):
+    """
+    Vectorized compute_word_emotion_scores over many segments at once.
+      tokens:    list of n tokens (all segments concatenated)
+      seg_ids:   (n,) segment number of each token; rules never cross segments
+      seg_probs: (segments, emotions) model probabilities
+    Returns the normalized (n, emotions) fused scores.
+    """
+    n = len(tokens)
+    if n == 0:
+        return np.zeros((0, len(EMOTIONS)))
+    seg_ids = np.asarray(seg_ids)
+
+    # Rule factors as array masks: a negator flips/damps the next two tokens,
+    # an intensifier boosts the next one (same order as apply_rules).
+    neg = np.fromiter((w in NEGATORS for w in tokens), dtype=bool, count=n)
+    inten = np.fromiter((w in INTENSIFIERS for w in tokens), dtype=bool, count=n) & ~neg
+    factor = np.ones(n)
+    same1 = seg_ids[1:] == seg_ids[:-1]
+    same2 = seg_ids[2:] == seg_ids[:-2]
+    factor[2:] *= np.where(neg[:-2] & same2, -0.7, 1.0)
+    factor[1:] *= np.where(neg[:-1] & same1, -0.7, 1.0)
+    factor[1:] *= np.where(inten[:-1] & same1, 1.8, 1.0)
+
+    adjusted = lex.matrix[lex.rows(tokens)].astype(np.float64) * factor[:, None]
+    probs = np.asarray(seg_probs, dtype=np.float64)[seg_ids]
+    fused = np.maximum(0.0, lam * adjusted + (1 - lam) * probs)
+
+    totals = fused.sum(axis=1, keepdims=True)
+    return np.divide(fused, totals, out=np.zeros_like(fused), where=totals > 0)
+
+def aggregate_song_importance_vectorized(song_segments, lex: LexiconMatrix):
+    """
+    Same result as aggregate_song_importance, computed on a (tokens, emotions)
+    array for the whole song. `lex` is a LexiconMatrix (see compile_lexicon).
+    song_segments is a list of segment dicts or a SongResults (whose probs
+    array is used directly).
+    """
+    columnar = hasattr(song_segments, "probs")
+    texts = song_segments.texts if columnar else [seg["text"] for seg in song_segments]
+    tokens, seg_ids = [], []
+    for i, text in enumerate(texts):
+        seg_tokens = simple_tokenize(text)
+        tokens.extend(seg_tokens)
+        seg_ids.extend([i] * len(seg_tokens))
+
+    song_importance = {e: defaultdict(float) for e in EMOTIONS}
+    if not tokens:
+        return song_importance
+
+    seg_probs = song_segments.probs if columnar else [seg["probs"] for seg in song_segments]
+    scores = word_emotion_matrix(tokens, seg_ids, seg_probs, lex)
+
+    # intern words in first-seen order so dict order matches the loop version
+    word_ids = {}
+    keep, inverse = [], []
+    for i, w in enumerate(tokens):
+        if w in STOPWORDS:
+            continue
+        keep.append(i)
+        inverse.append(word_ids.setdefault(w, len(word_ids)))
+    if not keep:
+        return song_importance
+
+    totals = np.zeros((len(word_ids), len(EMOTIONS)))
+    np.add.at(totals, np.asarray(inverse), scores[keep])
+
+    words = list(word_ids)
+    for j, e in enumerate(EMOTIONS):
+        song_importance[e].update(zip(words, totals[:, j].tolist()))
+    return song_importance
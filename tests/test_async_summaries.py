@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.async_summaries import AsyncSummarizer, is_transient
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class FakeClient:
+    """
+    chat.completions.create raising `errors` one after another, then answering.
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" summary "))])
+
+def complete(client, max_retries=3):
+    summarizer = AsyncSummarizer(client=client, max_retries=max_retries, backoff_base=0.001)
+    try:
+        future = asyncio.run_coroutine_threadsafe(summarizer._complete({"model": "m", "messages": []}), summarizer.loop)
+        return future.result(timeout=10)
+    finally:
+        summarizer.close()
+
+def test_non_retryable_error_is_raised_after_one_call():
+    client = FakeClient(StatusError(401))
+    with pytest.raises(StatusError):
+        complete(client)
+    assert client.calls == 1
+
+def test_programming_error_is_not_retried():
+    client = FakeClient(KeyError("messages"))
+    with pytest.raises(KeyError):
+        complete(client)
+    assert client.calls == 1
+
+def test_transient_errors_are_retried():
+    client = FakeClient(StatusError(429), StatusError(503), TimeoutError())
+    assert complete(client) == "summary"
+    assert client.calls == 4
+
+def test_retries_are_bounded():
+    client = FakeClient(*[StatusError(500)] * 5)
+    with pytest.raises(StatusError):
+        complete(client, max_retries=2)
+    assert client.calls == 3
+
+@pytest.mark.parametrize("status, transient", [(400, False), (401, False), (404, False), (408, True), (429, True), (500, True), (502, True)])
+def test_is_transient_by_status(status, transient):
+    assert is_transient(StatusError(status)) is transient
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.run_pipeline as rp
+from src.manifest import Manifest
+from src.results_store import ResultsStore, SongResults
+from src.sharding import shard_paths
+
+LEXICON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lexicons", "emotion_lexicon.csv"))
+N_SONGS = 9
+
+class FakeRenderPool:
+    """
+    Inline stand-in for RenderPool: one empty output file per song.
+    """
+
+    def __init__(self, lexicon, workers=0):
+        self.done = []
+
+    def submit(self, song_id, song_result, context=None):
+        path = os.path.join("outputs", "timelines", f"{song_id}.png")
+        open(path, "w").close()
+        self.done.append((context, {"error": None, "outputs": [path], "importance": {}, "seconds": 0.0}))
+
+    def completed(self, wait=False):
+        while self.done:
+            yield self.done.pop(0)
+
+    def close(self):
+        pass
+
+class FakeSummarizer:
+    """
+    Synchronous stand-in for AsyncSummarizer.
+    """
+
+    def __init__(self, client=None, cache=None):
+        self.done = []
+
+    def submit(self, song_id, song_segments, song_importance, out_path, context=None, arc=None):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(f"summary of {song_id}")
+        self.done.append((context, {"song_id": song_id, "path": out_path, "error": None, "seconds": 0.0}))
+
+    def completed(self, wait=False):
+        while self.done:
+            yield self.done.pop(0)
+
+    def close(self):
+        pass
+
+def fake_predictions(predicted_log, kill_after=None):
+    """
+    iter_song_predictions stand-in that logs each song it is asked for and
+    kills the process (no cleanup at all) when asked for song `kill_after` + 1.
+    """
+
+    def iter_song_predictions(songs, tokenizer, model, device, **kwargs):
+        rng = np.random.default_rng(0)
+        for n, song in enumerate(songs):
+            if n == kill_after:
+                os._exit(1)
+            with open(predicted_log, "a", encoding="utf-8") as f:
+                f.write(song["song_name"] + "\n")
+            probs = rng.random((len(song["segments"]), 6)).astype(np.float32)
+            yield song, SongResults.from_arrays(song["segments"], probs, probs)
+
+    return iter_song_predictions
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    pd.DataFrame({
+        "artist_name": [f"Artist {i}" for i in range(N_SONGS)],
+        "song_name": [f"Song {i}" for i in range(N_SONGS)],
+        "genres": ["Pop"] * N_SONGS,
+        "language": ["en"] * N_SONGS,
+        "lyrics": [f"first line of {i}\nsecond line\nthird line of {i}" for i in range(N_SONGS)],
+        "artist_popularity": list(range(N_SONGS)),
+        "new_artist_popularity": list(range(N_SONGS)),
+    }).to_csv(rp.CSV_PATH, index=False)
+    monkeypatch.setattr(rp, "LEXICON_PATH", LEXICON)
+    monkeypatch.setattr(rp, "load_model", lambda *args, **kwargs: (None, None, "cpu"))
+    monkeypatch.setattr(rp, "RenderPool", FakeRenderPool)
+    monkeypatch.setattr(rp, "AsyncSummarizer", FakeSummarizer)
+    monkeypatch.setattr(rp, "RESULTS_CHECKPOINT_SONGS", 2)
+    monkeypatch.setattr(rp, "RESULTS_CHECKPOINT_SECONDS", None)
+    return tmp_path
+
+def run_shard():
+    rp.run_pipeline(render_workers=0, shard=(0, 1))
+
+def predicted(log):
+    with open(log, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def test_killed_shard_resumes_after_completed_songs(catalog, monkeypatch):
+    paths = shard_paths(0, 1)
+
+    # first run: killed while asking for the 6th song
+    monkeypatch.setattr(rp, "iter_song_predictions", fake_predictions("first.log", kill_after=5))
+    process = multiprocessing.get_context("fork").Process(target=run_shard)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 1
+    assert len(predicted("first.log")) == 5
+
+    # checkpoints after songs 2 and 4: those are in the store and the manifest,
+    # song 5 finished but its part was never written, so it is not recorded
+    completed = [f"Song {i}" for i in range(4)]
+    manifest = Manifest(paths["manifest"], fingerprint="", readonly=True)
+    assert sorted(e["song_id"].split(" - ")[1] for e in manifest.entries.values()) == completed
+    assert all(f"Artist {i} - Song {i}" in ResultsStore(paths["results"]) for i in range(4))
+
+    monkeypatch.setattr(rp, "iter_song_predictions", fake_predictions("second.log"))
+    run_shard()
+    assert predicted("second.log") == [f"Song {i}" for i in range(4, N_SONGS)]
+    assert len(ResultsStore(paths["results"])) == N_SONGS
+    assert len(Manifest(paths["manifest"], fingerprint="", readonly=True).entries) == N_SONGS
+    assert os.path.exists(paths["done"])